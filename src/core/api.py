@@ -1,16 +1,18 @@
-from contextlib import asynccontextmanager
-from typing import AsyncIterator
+import asyncio
+import time
+from contextlib import asynccontextmanager, suppress
+from typing import AsyncIterator, Awaitable, Callable
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.requests import Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from fastapi_cache import FastAPICache
-from fastapi_cache.backends.redis import RedisBackend
 from prometheus_fastapi_instrumentator import Instrumentator
+from redis import asyncio as aioredis  # type: ignore
 from sqladmin import Admin
+from starlette.types import ASGIApp, Receive, Scope, Send
 
-from redis import asyncio as aioredis  # type: ignore
 from src.core import settings
 from src.core.admin import (
     LessonModelAdmin,
@@ -20,16 +22,37 @@ from src.core.admin import (
     LessonStepTimingModelAdmin,
     UserModelAdmin,
 )
-from src.core.errors import ResourceNotFoundError
+from src.core.cache import (
+    JSONBytesCoder,
+    TaggedRedisBackend,
+    TwoTierRedisBackend,
+    cache_key_builder,
+)
+from src.core.errors import BadRequestError, ResourceNotFoundError
+from src.core.local_cache import LocalCache
 from src.core.logger import logger
+from src.core.responses import PydanticJSONResponse
 from src.core.schemas import APIErrorMessage
-from src.database.db_manager import AsyncPostgresDatabaseManager
+from src.database.db_manager import get_db_manager
+from src.database.query_counter import observe_request_queries, track_queries
+from src.database.routing import route_request
+from src.lessons.dependencies import get_lesson_service_dep
 from src.lessons.views import router as lessons_router
 from src.texts.views import router as texts_router
 from src.users.errors import AuthError
 from src.users.views import auth_router, users_router
 
 
+async def warm_up_cache() -> None:
+    """Заполнение кэша каталога и статистики уроков до приема запросов"""
+    try:
+        async with get_db_manager().session_factory() as session:
+            lessons_service = await get_lesson_service_dep(session)
+            await lessons_service.warm_up_cache()
+    except Exception as e:
+        logger.warning(f"cache warm up failed: {e}")
+
+
 @asynccontextmanager
 async def lifespan(_: FastAPI) -> AsyncIterator[None]:
     logger.info("Start redis session")
@@ -37,9 +60,38 @@ async def lifespan(_: FastAPI) -> AsyncIterator[None]:
         f"redis://{settings.redis_settings.address}:{settings.redis_settings.port}",
         decode_responses=False,
     )
-    FastAPICache.init(RedisBackend(redis), prefix="fastapi-cache")
+    backend = TaggedRedisBackend(
+        redis,
+        lock_timeout=settings.settings.cache_lock_timeout,
+        refresh_timeout=settings.settings.cache_refresh_timeout,
+    )
+    if settings.settings.cache_local_max_entries:
+        backend = TwoTierRedisBackend(
+            redis,
+            LocalCache(
+                max_entries=settings.settings.cache_local_max_entries,
+                max_bytes=settings.settings.cache_local_max_bytes,
+                ttl=settings.settings.cache_local_ttl,
+            ),
+            lock_timeout=settings.settings.cache_lock_timeout,
+            refresh_timeout=settings.settings.cache_refresh_timeout,
+        )
+    FastAPICache.init(
+        backend,
+        prefix="fastapi-cache",
+        coder=JSONBytesCoder,
+        key_builder=cache_key_builder,
+    )
+    listener = None
+    if isinstance(backend, TwoTierRedisBackend):
+        listener = asyncio.create_task(backend.listen_invalidations())
+    await warm_up_cache()
     yield
     logger.info("Close redis session")
+    if listener is not None:
+        listener.cancel()
+        with suppress(asyncio.CancelledError):
+            await listener
     await redis.close()
 
 
@@ -48,6 +100,7 @@ api = FastAPI(
     description="API",
     version="1.0",
     lifespan=lifespan,
+    default_response_class=PydanticJSONResponse,
 )
 
 
@@ -56,9 +109,7 @@ api.include_router(texts_router)
 api.include_router(users_router)
 api.include_router(auth_router)
 
-admin = Admin(
-    api, AsyncPostgresDatabaseManager(url=settings.settings.postgres_url).engine
-)
+admin = Admin(api, get_db_manager().engine)
 
 admin.add_view(UserModelAdmin)
 admin.add_view(LessonModelAdmin)
@@ -70,6 +121,68 @@ admin.add_view(LessonStepTimingModelAdmin)
 
 Instrumentator().instrument(api).expose(api)
 
+
+# время (unix), до которого запросы клиента читают из основной бд
+PRIMARY_UNTIL_COOKIE = "db_primary_until"
+
+
+@api.middleware("http")
+async def db_routing_middleware(
+    request: Request, call_next: Callable[[Request], Awaitable[Response]]
+) -> Response:
+    """Чтение из основной бд в течение окна после записи клиента"""
+    try:
+        primary_until = float(request.cookies.get(PRIMARY_UNTIL_COOKIE, 0))
+    except ValueError:
+        primary_until = 0
+    with route_request(use_primary=time.time() < primary_until) as state:
+        response = await call_next(request)
+
+    if state.wrote and settings.settings.postgres_replica_urls:
+        window = settings.settings.postgres_replica_sticky_seconds
+        response.set_cookie(
+            PRIMARY_UNTIL_COOKIE,
+            str(time.time() + window),
+            max_age=int(window) + 1,
+            httponly=True,
+        )
+    return response
+
+
+class QueryStatsMiddleware:
+    """Подсчет SQL запросов http запроса и предупреждение о N+1
+
+    ASGI middleware без call_next: статистика читается после отправки
+    всего тела, поэтому учитываются и запросы потоковых ответов (NDJSON).
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries() as stats:
+            await self.app(scope, receive, send)
+
+        method = scope["method"]
+        handler = getattr(scope.get("route"), "path", "none")
+        observe_request_queries(method, handler, stats)
+
+        repeated = stats.most_repeated()
+        if repeated and repeated[1] > settings.settings.db_query_repeat_threshold:
+            statement, times = repeated
+            logger.warning(
+                f"N+1: {method} {handler} {stats.count} SQL запросов, "
+                f"{times} раз: {statement}"
+            )
+
+
+api.add_middleware(QueryStatsMiddleware)
+
+
 api.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -120,3 +233,18 @@ async def auth_error_handler(request: Request, exc: AuthError) -> JSONResponse:
         status_code=401,
         content=error_msg.model_dump(),
     )
+
+
+@api.exception_handler(BadRequestError)
+async def bad_request_error_handler(
+    request: Request, exc: BadRequestError
+) -> JSONResponse:
+    error_msg = APIErrorMessage(
+        type=exc.__class__.__name__,
+        message=f"{exc.args}",
+    )
+    logger.error(exc)
+    return JSONResponse(
+        status_code=400,
+        content=error_msg.model_dump(),
+    )
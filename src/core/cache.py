@@ -0,0 +1,627 @@
+"""Кэширование ответов (fastapi-cache)"""
+
+import asyncio
+import hashlib
+from contextlib import asynccontextmanager
+from contextvars import Context, ContextVar
+from functools import lru_cache, wraps
+from string import Formatter
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    TypeVar,
+)
+
+from fastapi_cache import FastAPICache
+from fastapi_cache import decorator as cache_decorator
+from fastapi_cache.backends.redis import RedisBackend
+from fastapi_cache.coder import Coder
+from fastapi_cache.key_builder import default_key_builder
+from fastapi_cache.types import Backend
+from pydantic import TypeAdapter
+from pydantic_core import from_json, to_json
+from redis.asyncio.client import Redis
+from redis.asyncio.lock import Lock
+from starlette.requests import Request
+from starlette.responses import Response
+
+from src.core.local_cache import CACHE_REQUESTS, LocalCache
+from src.core.logger import logger
+from src.core.responses import PydanticJSONResponse
+from src.core.singleflight import SingleFlight
+
+T = TypeVar("T")
+
+# теги записи кэша, которую сохраняет текущий вызов эндпоинта
+_cache_tags: ContextVar[Tuple[str, ...]] = ContextVar("cache_tags", default=())
+# ключ записи кэша текущего вызова эндпоинта (запоминает cache_key_builder)
+_cache_key: ContextVar[str | None] = ContextVar("cache_key", default=None)
+# запись уже сохранена при вычислении, повторный set декоратора не нужен
+_cache_stored_key: ContextVar[str | None] = ContextVar("cache_stored_key", default=None)
+
+# вычисления записей кэша в процессе
+_flights: SingleFlight[bytes] = SingleFlight()
+# фоновые обновления устаревших записей (ссылки, чтобы задачи не собрал gc)
+_refresh_tasks: Set["asyncio.Task[bytes]"] = set()
+
+# аргумент эндпоинта с id пользователя, от которого зависит ответ
+CACHE_KEY_USER_ARG = "user_id"
+
+# удаление записей кэша по тегам одной операцией, KEYS - множества тегов,
+# затем счетчики поколений тех же тегов, возвращает ключи удаленных записей.
+# Ключи записей не передаются в KEYS, поэтому скрипт работает только
+# на одиночном redis (не Redis Cluster)
+INVALIDATE_TAGS_SCRIPT = """
+local n = #KEYS / 2
+local deleted = {}
+for t = 1, n do
+    local keys = redis.call('SMEMBERS', KEYS[t])
+    for i = 1, #keys, 1000 do
+        redis.call('DEL', unpack(keys, i, math.min(i + 999, #keys)))
+    end
+    for _, key in ipairs(keys) do
+        table.insert(deleted, key)
+    end
+    redis.call('DEL', KEYS[t])
+    redis.call('INCR', KEYS[n + t])
+end
+return deleted
+"""
+
+# сохранение записи с регистрацией в тегах, если поколения тегов не изменились
+# с начала вычисления. KEYS - ключ записи, множества тегов, счетчики поколений,
+# ARGV - значение, expire (0 - без срока), поколения на начало вычисления
+# (без них проверка не выполняется). Возвращает 1, если запись сохранена
+SET_WITH_TAGS_SCRIPT = """
+local n = (#KEYS - 1) / 2
+for t = 1, #ARGV - 2 do
+    if (redis.call('GET', KEYS[1 + n + t]) or '0') ~= ARGV[2 + t] then
+        return 0
+    end
+end
+local expire = tonumber(ARGV[2])
+if expire > 0 then
+    redis.call('SET', KEYS[1], ARGV[1], 'EX', expire)
+else
+    redis.call('SET', KEYS[1], ARGV[1])
+end
+for t = 1, n do
+    redis.call('SADD', KEYS[1 + t], KEYS[1])
+    if expire > 0 and redis.call('TTL', KEYS[1 + t]) < expire then
+        redis.call('EXPIRE', KEYS[1 + t], expire)
+    end
+end
+return 1
+"""
+
+
+class JSONBytesCoder(Coder):
+    """Хранит в кэше готовое тело JSON ответа и отдает его без перекодирования"""
+
+    @classmethod
+    def encode(cls, value: Any) -> bytes:
+        if isinstance(value, Response):
+            return bytes(value.body)
+        return to_json(value)
+
+    @classmethod
+    def decode(cls, value: bytes) -> Any:
+        return from_json(value)
+
+    @classmethod
+    def decode_as_type(cls, value: bytes, *, type_: Any) -> Any:
+        return PydanticJSONResponse(content=value)
+
+
+class TaggedRedisBackend(RedisBackend):
+    """Redis бэкенд, регистрирующий записи кэша под тегами
+
+    Тег - множество ключей кэша в redis, живет не меньше самой долгой записи.
+    Сброс тега увеличивает его поколение: запись, вычисление которой началось
+    до сброса, не сохраняется (см. get_tag_generations).
+    С lock_timeout вычисление записи при промахе блокируется между процессами.
+    Фоновое обновление устаревшей записи захватывает один процесс
+    не дольше refresh_timeout.
+    Redis Cluster не поддерживается: записи тега лежат в разных слотах.
+    """
+
+    def __init__(
+        self,
+        redis: "Redis[bytes]",
+        lock_timeout: float | None = None,
+        refresh_timeout: float = 30,
+    ):
+        super().__init__(redis)
+        if self.is_cluster:
+            raise ValueError("Сброс кэша по тегам не работает с Redis Cluster")
+        self.lock_timeout = lock_timeout
+        self.refresh_timeout = refresh_timeout
+
+    def get_tag_key(self, tag: str) -> str:
+        return f"{FastAPICache.get_prefix()}:tag:{tag}"
+
+    def get_tag_generation_key(self, tag: str) -> str:
+        return f"{FastAPICache.get_prefix()}:tag_gen:{tag}"
+
+    async def get_tag_generations(self, tags: Sequence[str]) -> List[int]:
+        """Поколения тегов, читаются до вычисления записи и передаются в set"""
+        if not tags:
+            return []
+        values = await self.redis.mget(
+            [self.get_tag_generation_key(tag) for tag in tags]
+        )
+        return [int(value or 0) for value in values]
+
+    async def set(self, key: str, value: bytes, expire: Optional[int] = None) -> None:
+        if _cache_stored_key.get() == key:
+            return
+        await self.set_with_tags(key, value, expire, _cache_tags.get())
+
+    async def set_with_tags(
+        self,
+        key: str,
+        value: bytes,
+        expire: Optional[int] = None,
+        tags: Sequence[str] = (),
+        generations: Sequence[int] | None = None,
+    ) -> bool:
+        """Сохранение записи и регистрация ее ключа в тегах
+
+        С generations запись не сохраняется, если какой-то тег сброшен
+        после их чтения: значение могло быть вычислено до записи в бд.
+        Возвращает True, если запись сохранена.
+        """
+        if not tags:
+            await super().set(key, value, expire)
+            return True
+
+        stored = await self.redis.eval(  # type: ignore[union-attr]
+            SET_WITH_TAGS_SCRIPT,
+            1 + 2 * len(tags),
+            key,
+            *(self.get_tag_key(tag) for tag in tags),
+            *(self.get_tag_generation_key(tag) for tag in tags),
+            value,
+            expire or 0,
+            *(generations or ()),
+        )
+        return bool(stored)
+
+    async def invalidate(self, tags: Iterable[str]) -> List[str]:
+        """Удаление записей кэша с тегами, возвращает ключи удаленных записей"""
+        tags = list(tags)
+        if not tags:
+            return []
+        deleted = await self.redis.eval(  # type: ignore[union-attr]
+            INVALIDATE_TAGS_SCRIPT,
+            2 * len(tags),
+            *(self.get_tag_key(tag) for tag in tags),
+            *(self.get_tag_generation_key(tag) for tag in tags),
+        )
+        return [key.decode() if isinstance(key, bytes) else key for key in deleted]
+
+    @asynccontextmanager
+    async def lock(self, key: str) -> AsyncIterator[None]:
+        """Блокировка вычисления записи между процессами
+
+        Пока запись вычисляет другой процесс, ждет не дольше lock_timeout,
+        затем вычисляет без блокировки.
+        """
+        lock = self.redis.lock(
+            f"{key}:lock",
+            timeout=self.lock_timeout,
+            blocking_timeout=self.lock_timeout,
+        )
+        try:
+            acquired = await lock.acquire()
+        except Exception as e:
+            logger.warning(f"cache lock failed key={key}: {e}")
+            acquired = False
+        try:
+            yield
+        finally:
+            if acquired:
+                try:
+                    await lock.release()
+                except Exception as e:
+                    logger.warning(f"cache lock release failed key={key}: {e}")
+
+    async def claim_refresh(self, key: str) -> Lock | None:
+        """Захват фонового обновления записи (SET NX), None - уже захвачено
+
+        Захват снимается через release() после обновления или истекает
+        через refresh_timeout.
+        """
+        lock = self.redis.lock(f"{key}:refresh", timeout=self.refresh_timeout)
+        if await lock.acquire(blocking=False):
+            return lock
+        return None
+
+
+class TwoTierRedisBackend(TaggedRedisBackend):
+    """Redis бэкенд с локальным кэшем процесса (L1) перед redis
+
+    Горячие ключи отдаются из памяти без обращения к redis. Сброс по тегам
+    публикует удаленные ключи в redis, остальные процессы удаляют их из
+    локального кэша (listen_invalidations). Pub/sub не гарантирует доставку,
+    поэтому TTL локального кэша тоже короткий.
+    """
+
+    def __init__(
+        self,
+        redis: "Redis[bytes]",
+        local_cache: LocalCache,
+        lock_timeout: float | None = None,
+        refresh_timeout: float = 30,
+    ):
+        super().__init__(redis, lock_timeout, refresh_timeout)
+        self.local_cache = local_cache
+
+    async def get_with_ttl(self, key: str) -> Tuple[int, Optional[bytes]]:
+        ttl, value = self.local_cache.get_with_ttl(key)
+        if value is not None:
+            return ttl, value
+
+        ttl, value = await super().get_with_ttl(key)
+        CACHE_REQUESTS.labels(
+            tier="redis", result="miss" if value is None else "hit"
+        ).inc()
+        if value is not None:
+            self.local_cache.set(key, value, ttl)
+        return ttl, value
+
+    async def get(self, key: str) -> Optional[bytes]:
+        _, value = await self.get_with_ttl(key)
+        return value
+
+    async def set_with_tags(
+        self,
+        key: str,
+        value: bytes,
+        expire: Optional[int] = None,
+        tags: Sequence[str] = (),
+        generations: Sequence[int] | None = None,
+    ) -> bool:
+        stored = await super().set_with_tags(key, value, expire, tags, generations)
+        if stored:
+            self.local_cache.set(key, value, expire)
+        return stored
+
+    def get_invalidation_channel(self) -> str:
+        return f"{FastAPICache.get_prefix()}:invalidate"
+
+    async def invalidate(self, tags: Iterable[str]) -> List[str]:
+        deleted = await super().invalidate(tags)
+        self.local_cache.delete(*deleted)
+        if deleted:
+            await self.redis.publish(self.get_invalidation_channel(), to_json(deleted))
+        return deleted
+
+    async def listen_invalidations(self, retry_delay: float = 1) -> None:
+        """Удаление из локального кэша записей, сброшенных другими процессами
+
+        Работает до отмены задачи. Сообщения, пришедшие до подписки или во время
+        переподключения, теряются, поэтому после подписки локальный кэш
+        очищается.
+        """
+        channel = self.get_invalidation_channel()
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.subscribe(channel)
+                self.local_cache.clear()
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        self.local_cache.delete(*from_json(message["data"]))
+            except Exception as e:
+                logger.warning(f"cache invalidation listener failed: {e}")
+            finally:
+                await pubsub.reset()
+            await asyncio.sleep(retry_delay)
+
+    async def clear(
+        self, namespace: Optional[str] = None, key: Optional[str] = None
+    ) -> int:
+        self.local_cache.clear()
+        return await super().clear(namespace, key)
+
+
+def cache_key_builder(
+    func: Callable[..., Any],
+    namespace: str = "",
+    *,
+    request: Optional[Request] = None,
+    response: Optional[Response] = None,
+    args: Tuple[Any, ...],
+    kwargs: Dict[str, Any],
+) -> str:
+    """Ключ кэша: маршрут, параметры пути и запроса и id пользователя
+
+    Внедренные зависимости (сервисы с сессией бд) в ключ не попадают,
+    иначе ключ разный для каждого запроса.
+    """
+    if request is None:
+        return default_key_builder(
+            func,
+            namespace,
+            request=request,
+            response=response,
+            args=args,
+            kwargs=kwargs,
+        )
+    route = getattr(request.scope.get("route"), "path", request.url.path)
+    params = {
+        "path": sorted(request.path_params.items()),
+        "query": sorted(request.query_params.multi_items()),
+        "user_id": kwargs.get(CACHE_KEY_USER_ARG),
+    }
+    digest = hashlib.md5(to_json(params)).hexdigest()  # noqa: S324
+    key = f"{namespace}:{request.method}:{route}:{digest}"
+    _cache_key.set(key)
+    return key
+
+
+def format_tags(tags: Sequence[str], values: Dict[str, Any]) -> Tuple[str, ...]:
+    """Теги из шаблонов вида "lesson:{id}" по аргументам эндпоинта
+
+    Шаблоны, для которых аргумент не передан или равен None, пропускаются.
+    """
+    result = []
+    for tag in tags:
+        fields = [name for _, name, _, _ in Formatter().parse(tag) if name]
+        if all(values.get(name) is not None for name in fields):
+            result.append(tag.format(**values))
+    return tuple(result)
+
+
+def cache(
+    expire: int, tags: Sequence[str] = ()
+) -> Callable[[Callable[..., Awaitable[Any]]], Callable[..., Awaitable[Any]]]:
+    """Кэширование ответа эндпоинта с регистрацией под тегами
+
+    Одновременные промахи по одному ключу вычисляют ответ один раз.
+
+    Args:
+        expire (int): время жизни записи, сек
+        tags (Sequence[str]): шаблоны тегов, например "lesson:{id}",
+            подставляются аргументы эндпоинта
+    """
+
+    def wrapper(func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+
+        @wraps(func)
+        async def load_once(*args: Any, **kwargs: Any) -> Any:
+            key = _cache_key.get()
+            if key is None:
+                return await func(*args, **kwargs)
+            backend = FastAPICache.get_backend()
+            coder = FastAPICache.get_coder()
+
+            async def load() -> bytes:
+                tags = _cache_tags.get()
+                generations = await _get_tag_generations(backend, tags)
+                value = coder.encode(await func(*args, **kwargs))
+                await _set_value(backend, key, value, expire, tags, generations)
+                return value
+
+            value = await _load_once(backend, key, load)
+            _cache_stored_key.set(key)
+            return coder.decode_as_type(value, type_=None)
+
+        cached_func = cache_decorator.cache(expire=expire)(load_once)
+
+        @wraps(cached_func)
+        async def inner(*args: Any, **kwargs: Any) -> Any:
+            tags_token = _cache_tags.set(format_tags(tags, kwargs))
+            key_token = _cache_key.set(None)
+            stored_token = _cache_stored_key.set(None)
+            try:
+                return await cached_func(*args, **kwargs)
+            finally:
+                _cache_stored_key.reset(stored_token)
+                _cache_key.reset(key_token)
+                _cache_tags.reset(tags_token)
+
+        return inner
+
+    return wrapper
+
+
+async def invalidate_cache_tags(*tags: str) -> None:
+    """Сброс записей кэша с тегами после записи в бд
+
+    Ошибки redis не прерывают запрос, записи доживут до истечения expire.
+    """
+    if not FastAPICache._init:
+        return
+    backend = FastAPICache.get_backend()
+    if not isinstance(backend, TaggedRedisBackend):
+        return
+    try:
+        await backend.invalidate(tags)
+    except Exception as e:
+        logger.warning(f"cache tags invalidation failed tags={tags}: {e}")
+
+
+@lru_cache(maxsize=None)
+def _get_type_adapter(type_: Any) -> TypeAdapter[Any]:
+    return TypeAdapter(type_)
+
+
+async def cached_value(
+    key: str,
+    type_: Any,
+    load: Callable[[], Awaitable[T]],
+    expire: int,
+    tags: Sequence[str] = (),
+    stale_ttl: int = 0,
+    refresh: Callable[[], Awaitable[T]] | None = None,
+) -> T:
+    """Значение из кэша или из load() с сохранением в кэш
+
+    Для частей ответа, которые кэшируются отдельно и собираются в сервисе
+    (например, общее содержимое урока и прогресс пользователя).
+    Запись живет expire + stale_ttl: после expire она устаревшая,
+    отдается как есть и обновляется в фоне через refresh.
+
+    Args:
+        key (str): ключ без префикса кэша
+        type_ (Any): тип значения для чтения из кэша (схема, List[...], Dict[...])
+        load (Callable[[], Awaitable[T]]): загрузка значения при промахе
+        expire (int): время, в течение которого запись свежая, сек
+        tags (Sequence[str]): теги записи
+        stale_ttl (int): сколько еще отдавать устаревшую запись, сек
+        refresh (Callable[[], Awaitable[T]] | None): загрузка значения в фоне,
+            не должна использовать ресурсы запроса (сессию бд),
+            без нее устаревшая запись загружается заново сразу
+    """
+    if not FastAPICache._init:
+        return await load()
+    backend = FastAPICache.get_backend()
+    key = f"{FastAPICache.get_prefix()}:{key}"
+
+    def store(loader: Callable[[], Awaitable[T]]) -> Callable[[], Awaitable[bytes]]:
+        async def load_value() -> bytes:
+            generations = await _get_tag_generations(backend, tags)
+            value = to_json(await loader())
+            await _set_value(backend, key, value, expire + stale_ttl, tags, generations)
+            return value
+
+        return load_value
+
+    ttl, cached = await _get_value_with_ttl(backend, key)
+    if cached is not None and _is_stale(ttl, stale_ttl):
+        if refresh is None:
+            cached = None
+        else:
+            await _refresh_in_background(
+                backend,
+                key,
+                lambda: _load_once(backend, key, store(refresh), stale_ttl),
+            )
+    if cached is None:
+        cached = await _load_once(backend, key, store(load), stale_ttl)
+    # каждый вызов получает свою копию значения, даже при общем вычислении
+    return _get_type_adapter(type_).validate_json(cached)  # type: ignore[no-any-return]
+
+
+def _is_stale(ttl: int, stale_ttl: int) -> bool:
+    """Запись живет expire + stale_ttl, последние stale_ttl сек она устаревшая"""
+    return 0 <= ttl < stale_ttl
+
+
+async def _get_value_with_ttl(backend: Backend, key: str) -> Tuple[int, bytes | None]:
+    try:
+        return await backend.get_with_ttl(key)
+    except Exception as e:
+        logger.warning(f"cache get failed key={key}: {e}")
+        return 0, None
+
+
+async def _get_tag_generations(
+    backend: Backend, tags: Sequence[str]
+) -> Sequence[int] | None:
+    """Поколения тегов до вычисления записи, None - сохранять без проверки"""
+    if not isinstance(backend, TaggedRedisBackend) or not tags:
+        return None
+    try:
+        return await backend.get_tag_generations(tags)
+    except Exception as e:
+        logger.warning(f"cache tag generations failed tags={tags}: {e}")
+        return None
+
+
+async def _set_value(
+    backend: Backend,
+    key: str,
+    value: bytes,
+    expire: int,
+    tags: Sequence[str],
+    generations: Sequence[int] | None = None,
+) -> None:
+    try:
+        if isinstance(backend, TaggedRedisBackend):
+            if not await backend.set_with_tags(key, value, expire, tags, generations):
+                logger.debug(f"cache set skipped, tags invalidated key={key}")
+        else:
+            await backend.set(key, value, expire)
+    except Exception as e:
+        logger.warning(f"cache set failed key={key}: {e}")
+
+
+async def _load_once(
+    backend: Backend,
+    key: str,
+    load: Callable[[], Awaitable[bytes]],
+    stale_ttl: int = 0,
+) -> bytes:
+    """Одно вычисление записи кэша на ключ
+
+    В процессе одновременные промахи ждут одно вычисление, между процессами -
+    под блокировкой в redis, если она включена. Так же обновляются
+    устаревшие записи (stale_ttl - см. cached_value).
+    """
+
+    async def load_locked() -> bytes:
+        if not isinstance(backend, TaggedRedisBackend) or not backend.lock_timeout:
+            return await load()
+        async with backend.lock(key):
+            # пока ждали блокировку, запись мог обновить другой процесс
+            ttl, cached = await _get_value_with_ttl(backend, key)
+            if cached is not None and not _is_stale(ttl, stale_ttl):
+                return cached
+            return await load()
+
+    return await _flights.do(key, load_locked)
+
+
+async def _refresh_in_background(
+    backend: Backend, key: str, refresh: Callable[[], Awaitable[bytes]]
+) -> None:
+    """Обновление устаревшей записи в фоне, одно на ключ
+
+    Задача не создается, пока ключ вычисляется в процессе или обновление
+    захватил другой процесс. refresh должен идти через _load_once: сохранение
+    проверяет поколения тегов и не перезапишет сброшенную запись.
+    """
+    if key in _flights:
+        return
+    claim = None
+    if isinstance(backend, TaggedRedisBackend):
+        try:
+            claim = await backend.claim_refresh(key)
+        except Exception as e:
+            logger.warning(f"cache refresh claim failed key={key}: {e}")
+            return
+        if claim is None:
+            return
+
+    async def refresh_claimed() -> bytes:
+        try:
+            return await refresh()
+        finally:
+            if claim is not None:
+                try:
+                    await claim.release()
+                except Exception as e:
+                    logger.warning(f"cache refresh release failed key={key}: {e}")
+
+    # задача не наследует контекст запроса (теги, маршрутизацию бд, счетчики)
+    task = asyncio.create_task(refresh_claimed(), context=Context())
+    _refresh_tasks.add(task)
+    task.add_done_callback(_on_refresh_done)
+
+
+def _on_refresh_done(task: "asyncio.Task[bytes]") -> None:
+    _refresh_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning(f"cache refresh failed: {task.exception()}")
@@ -1,11 +1,14 @@
+from typing import Annotated
+
+from fastapi import Query
+
 from redis import asyncio as aioredis  # type: ignore
+from src.core.schemas import PaginationForm
 from src.core.settings import redis_settings, settings
-from src.database.db_manager import AsyncPostgresDatabaseManager
+from src.database.db_manager import get_db_manager
+from src.database.pagination import parse_order_by
 
-get_session = AsyncPostgresDatabaseManager(
-    url=settings.postgres_url,
-    echo=settings.postgres_echo,
-).get_async_session
+get_session = get_db_manager().get_async_session
 
 
 async def get_cache():
@@ -14,3 +17,19 @@ async def get_cache():
         encoding="utf-8",
     )
     return redis
+
+
+def get_pagination_dep(
+    limit: Annotated[int, Query(ge=1, le=settings.page_size_max)] = settings.page_size,
+    cursor: Annotated[str | None, Query()] = None,
+    order_by: Annotated[
+        str | None,
+        Query(description="Поля сортировки через запятую, -field по убыванию"),
+    ] = None,
+) -> PaginationForm:
+    """Параметры постраничного получения списков"""
+    return PaginationForm(
+        limit=limit,
+        cursor=cursor,
+        order_by=parse_order_by(order_by),
+    )
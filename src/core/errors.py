@@ -1,2 +1,6 @@
 class ResourceNotFoundError(Exception):
     pass
+
+
+class BadRequestError(Exception):
+    pass
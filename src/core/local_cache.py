@@ -0,0 +1,85 @@
+"""Кэш в памяти процесса (L1) перед redis"""
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Tuple
+
+from prometheus_client import Counter
+
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "Обращения к кэшу по уровням (local, redis)",
+    ["tier", "result"],
+)
+
+
+@dataclass
+class LocalCacheEntry:
+    value: bytes
+    expires_at: float  # срок жизни в локальном кэше (time.monotonic)
+    remote_expires_at: float | None  # срок жизни записи в redis
+
+
+class LocalCache:
+    """LRU кэш с TTL, ограниченный количеством записей и суммарным размером
+
+    TTL короткий: если сообщение о сбросе по тегам в другом процессе
+    потеряно, запись остается в локальном кэше не дольше ttl.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.size = 0  # суммарный размер значений, байт
+        self._entries: OrderedDict[str, LocalCacheEntry] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_with_ttl(self, key: str) -> Tuple[int, bytes | None]:
+        """Значение и оставшееся время жизни записи в redis (-1 без срока)"""
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is None or entry.expires_at <= now:
+            if entry is not None:
+                self.delete(key)
+            CACHE_REQUESTS.labels(tier="local", result="miss").inc()
+            return 0, None
+
+        self._entries.move_to_end(key)
+        CACHE_REQUESTS.labels(tier="local", result="hit").inc()
+        if entry.remote_expires_at is None:
+            return -1, entry.value
+        return max(int(entry.remote_expires_at - now), 0), entry.value
+
+    def set(self, key: str, value: bytes, expire: int | None = None) -> None:
+        """Сохранение записи, expire - оставшееся время жизни в redis"""
+        self.delete(key)
+        if len(value) > self.max_bytes:
+            return
+
+        now = time.monotonic()
+        ttl = min(self.ttl, expire) if expire and expire > 0 else self.ttl
+        self._entries[key] = LocalCacheEntry(
+            value=value,
+            expires_at=now + ttl,
+            remote_expires_at=now + expire if expire and expire > 0 else None,
+        )
+        self.size += len(value)
+
+        # вытеснение давно не использованных записей
+        while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+            oldest_key = next(iter(self._entries))
+            self.delete(oldest_key)
+
+    def delete(self, *keys: str) -> None:
+        for key in keys:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.size -= len(entry.value)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.size = 0
@@ -0,0 +1,56 @@
+from typing import Any, AsyncIterator, Sequence
+
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+from pydantic_core import to_json
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.background import BackgroundTask
+
+from src.database.dto import construct_schema
+
+
+class PydanticJSONResponse(JSONResponse):
+    """JSON ответ, сериализующий pydantic модели сразу в bytes (pydantic-core)
+
+    content может быть моделью, списком/словарем моделей или уже готовым
+    JSON в bytes (например, из кэша) - он отдается без изменений.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return to_json(content)
+
+
+class NDJSONResponse(StreamingResponse):
+    """Потоковая выдача объектов в формате NDJSON (объект на строку)
+
+    Зависимости с yield завершаются до начала отправки тела ответа,
+    поэтому сессия, из которой читаются пачки, закрывается после отправки.
+    """
+
+    media_type = "application/x-ndjson"
+
+    def __init__(
+        self,
+        batches: AsyncIterator[Sequence[BaseModel]],
+        session: AsyncSession,
+        schema: type[BaseModel] | None = None,
+        status_code: int = 200,
+    ):
+        super().__init__(
+            content=self.encode_batches(batches, schema),
+            status_code=status_code,
+            background=BackgroundTask(session.close),
+        )
+
+    @staticmethod
+    async def encode_batches(
+        batches: AsyncIterator[Sequence[BaseModel]],
+        schema: type[BaseModel] | None = None,
+    ) -> AsyncIterator[bytes]:
+        """Пачка объектов - один chunk ответа"""
+        async for batch in batches:
+            if schema is not None:
+                batch = [construct_schema(schema, item) for item in batch]
+            yield b"".join(item.model_dump_json().encode() + b"\n" for item in batch)
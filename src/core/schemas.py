@@ -1,8 +1,16 @@
 from __future__ import annotations
 
+from typing import List
+
 from pydantic import BaseModel
 
 
 class APIErrorMessage(BaseModel):
     type: str
     message: str
+
+
+class PaginationForm(BaseModel):
+    limit: int
+    cursor: str | None = None
+    order_by: List[str] = []
@@ -1,4 +1,5 @@
 import os
+from typing import List, Literal
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -11,6 +12,53 @@ class ServiceSettings(BaseSettings):
 
     postgres_url: str = os.environ.get("DB_URL", "locahost")
     postgres_echo: bool = bool(os.environ.get("DB_ECHO", False))
+    # пул соединений на процесс (воркер), всего соединений до
+    # (pool_size + max_overflow) * количество воркеров
+    postgres_pool_size: int = 5
+    postgres_max_overflow: int = 10
+    postgres_pool_timeout: float = 30  # ожидание свободного соединения, сек
+    postgres_pool_recycle: int = 1800  # пересоздание соединения, сек
+    postgres_pool_pre_ping: bool = True
+    postgres_connect_timeout: float = 10
+    postgres_command_timeout: float | None = None  # таймаут запроса, сек
+    # реплики для чтения (JSON список url), выбор реплики и время после записи,
+    # в течение которого запросы клиента читают из основной бд
+    postgres_replica_urls: List[str] = []
+    postgres_replica_strategy: Literal["round_robin", "least_connections"] = (
+        "round_robin"
+    )
+    postgres_replica_sticky_seconds: float = 5
+
+    page_size: int = 100  # размер страницы списков по умолчанию
+    page_size_max: int = 1000
+    stream_batch_size: int = 1000  # размер пачки потоковых выгрузок
+
+    # потоки для bcrypt на процесс, остальные хэширования ждут в очереди
+    password_hash_workers: int = 2
+    # кэш авторизации в процессе: проверенные токены живут до своего exp,
+    # пользователи (существование, is_admin) - auth_user_cache_ttl сек
+    auth_token_cache_max_entries: int = 10000
+    auth_user_cache_max_entries: int = 10000
+    auth_user_cache_ttl: float = 30
+
+    # предупреждение о N+1, если один запрос повторился больше раз за http запрос
+    db_query_repeat_threshold: int = 10
+
+    # время жизни кэша ответов, которые сбрасываются по тегам при записи
+    cache_expire: int = 3600
+    cache_stats_expire: int = 100  # статистика уроков не сбрасывается по тегам
+    # после expire запись еще cache_stale_ttl сек отдается, обновляясь в фоне
+    cache_stale_ttl: int = 300
+    # локальный кэш процесса перед redis (0 записей - отключен), TTL в сек.
+    # Сброс по тегам доходит до других воркеров через pub/sub, TTL - на случай
+    # потерянных сообщений, держать в пределах нескольких секунд
+    cache_local_max_entries: int = 1000
+    cache_local_max_bytes: int = 16 * 1024 * 1024
+    cache_local_ttl: float = 5
+    # блокировка вычисления записи кэша между воркерами (None - отключена), сек
+    cache_lock_timeout: float | None = None
+    # фоновое обновление устаревшей записи захватывается одним воркером, сек
+    cache_refresh_timeout: float = 30
 
 
 settings = ServiceSettings()
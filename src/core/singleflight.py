@@ -0,0 +1,53 @@
+"""Объединение одновременных вычислений одного ключа"""
+
+import asyncio
+from typing import Awaitable, Callable, Dict, Generic, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight(Generic[T]):
+    """Одно вычисление на ключ в процессе, остальные вызовы ждут его результат
+
+    Ошибка вычисления получают все ожидающие. Если вычисляющий запрос
+    отменен (клиент отключился), ожидающие повторяют вычисление сами.
+    """
+
+    def __init__(self) -> None:
+        self._flights: Dict[str, asyncio.Future[T]] = {}
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._flights
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        while True:
+            flight = self._flights.get(key)
+            if flight is None:
+                return await self._run(key, fn)
+            try:
+                return await asyncio.shield(flight)
+            except asyncio.CancelledError:
+                if not flight.cancelled():
+                    raise
+
+    async def _run(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        flight: asyncio.Future[T] = asyncio.get_running_loop().create_future()
+        # ошибка может быть никем не получена, это не повод для предупреждения
+        flight.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._flights[key] = flight
+        try:
+            result = await fn()
+        except Exception as e:
+            flight.set_exception(e)
+            raise
+        except BaseException:
+            flight.cancel()
+            raise
+        else:
+            flight.set_result(result)
+            return result
+        finally:
+            del self._flights[key]
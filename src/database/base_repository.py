@@ -1,12 +1,39 @@
-from typing import List
+from typing import Any, AsyncIterator, Callable, Dict, List, Literal, Sequence, Tuple
 
 from pydantic import BaseModel as BasePydanticModel
-from sqlalchemy import select
+from sqlalchemy import ColumnElement, insert, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import (
+    InstrumentedAttribute,
+    Load,
+    joinedload,
+    selectinload,
+    subqueryload,
+)
+from sqlalchemy.orm.exc import StaleDataError
 
 from src.core.errors import ResourceNotFoundError
 from src.database.base_model import BaseSqlAlchemyModel
-from src.database.base_schemas import DbEntityBaseSchema
+from src.database.base_schemas import DbEntityBaseSchema, PageSchema
+from src.database.dto import construct_from_row, construct_schema, get_schema_columns
+from src.database.pagination import (
+    decode_cursor,
+    encode_cursor,
+    get_order_columns,
+    keyset_filter,
+)
+
+# Стратегии загрузки связей:
+# joined - один запрос с JOIN (декартово произведение для нескольких коллекций),
+# selectin/subquery - отдельный запрос на каждый уровень связей
+LoadStrategy = Literal["joined", "selectin", "subquery"]
+
+LOADERS: Dict[str, Callable[..., Load]] = {
+    "joined": joinedload,
+    "selectin": selectinload,
+    "subquery": subqueryload,
+}
 
 
 class RepoTypeCheckedMeta(type):
@@ -47,16 +74,29 @@ class RepoTypeCheckedMeta(type):
 
 
 class BaseSqlAlchemyRepository(metaclass=RepoTypeCheckedMeta):
-    """Базовый класс для crud операций с моделью sqlalchemy"""
+    """Базовый класс для crud операций с моделью sqlalchemy
+
+    Изменяющие методы делают только flush, транзакцию фиксирует
+    UnitOfWork на уровне сервиса.
+    """
 
     model: type[BaseSqlAlchemyModel] = BaseSqlAlchemyModel
     entity_schema: type[DbEntityBaseSchema] = DbEntityBaseSchema
     create_schema: type[BasePydanticModel] = BasePydanticModel
     update_schema: type[BasePydanticModel] = BasePydanticModel
+    load_strategy: LoadStrategy = "selectin"
 
     def __init__(self, session: AsyncSession):
         self.session = session
 
+    def get_columns(self) -> List[InstrumentedAttribute[Any]]:
+        """Колонки модели для полей entity_schema (select без загрузки ORM объектов)"""
+        return list(get_schema_columns(self.entity_schema, self.model))
+
+    def get_loader(self, strategy: LoadStrategy | None = None) -> Callable[..., Load]:
+        """Функция загрузки связей для стратегии (по умолчанию стратегия репозитория)"""
+        return LOADERS[strategy or self.load_strategy]
+
     async def get_one(self, id: int) -> BasePydanticModel:
         """Получение объекта по id"""
         obj = await self.session.get(self.model, id)
@@ -68,16 +108,15 @@ class BaseSqlAlchemyRepository(metaclass=RepoTypeCheckedMeta):
                 )
             )
         else:
-            return self.entity_schema.model_validate(obj)
+            return construct_schema(self.entity_schema, obj)
 
     async def get_all(self) -> List[DbEntityBaseSchema]:
         """Получение всех объектов"""
-        stmt = select(self.model)
+        stmt = select(*self.get_columns())
         query_result = await self.session.execute(stmt)
 
         result = [
-            self.entity_schema.model_validate(model)
-            for model in query_result.scalars().all()
+            construct_from_row(self.entity_schema, row) for row in query_result.all()
         ]
         return result
 
@@ -85,8 +124,126 @@ class BaseSqlAlchemyRepository(metaclass=RepoTypeCheckedMeta):
         """Добавление объекта"""
         new_object = self.model(**new_entity.model_dump())
         self.session.add(new_object)
-        await self.session.commit()
-        return self.entity_schema.model_validate(new_object)
+        await self.session.flush()
+        return construct_schema(self.entity_schema, new_object)
+
+    async def add_many(
+        self, new_entities: Sequence[BasePydanticModel]
+    ) -> List[DbEntityBaseSchema]:
+        """Добавление объектов одним multi-row INSERT ... RETURNING
+
+        Возвращает объекты в порядке входных данных.
+        """
+        if not new_entities:
+            return []
+        stmt = insert(self.model).returning(self.model, sort_by_parameter_order=True)
+        query_result = await self.session.execute(
+            stmt, [entity.model_dump() for entity in new_entities]
+        )
+        result = [
+            construct_schema(self.entity_schema, obj)
+            for obj in query_result.scalars().all()
+        ]
+        return result
+
+    async def upsert_many(
+        self,
+        entities: Sequence[BasePydanticModel],
+        index_elements: Sequence[str],
+        update_fields: Sequence[str] | None = None,
+    ) -> List[DbEntityBaseSchema]:
+        """Добавление или обновление объектов INSERT ... ON CONFLICT ... RETURNING
+
+        Args:
+            entities (Sequence[BasePydanticModel]): данные объектов
+            index_elements (Sequence[str]): поля уникального индекса для ON CONFLICT
+            update_fields (Sequence[str] | None): поля, обновляемые при конфликте,
+                по умолчанию все переданные поля кроме index_elements;
+                пустой список - ON CONFLICT DO NOTHING
+                (существующие объекты в результат не попадают)
+
+        Объекты с одинаковыми значениями index_elements схлопываются
+        в один (побеждает последний), иначе postgres не даст обновить
+        одну строку дважды в одном запросе.
+
+        Returns:
+            List[DbEntityBaseSchema]: объекты в порядке первого появления
+                значения index_elements во входных данных
+        """
+        if not entities:
+            return []
+        unique_values: Dict[Tuple[Any, ...], Dict[str, Any]] = {}
+        for entity in entities:
+            value = entity.model_dump()
+            unique_values[tuple(value[field] for field in index_elements)] = value
+        values = list(unique_values.values())
+        if update_fields is None:
+            update_fields = [
+                field for field in values[0] if field not in index_elements
+            ]
+
+        stmt = pg_insert(self.model)
+        if update_fields:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=index_elements,
+                set_={field: stmt.excluded[field] for field in update_fields},
+            )
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=index_elements)
+        stmt = stmt.returning(self.model)
+
+        query_result = await self.session.execute(
+            stmt,
+            values,
+            execution_options={"populate_existing": True},
+        )
+        # порядок строк RETURNING восстанавливаем по значениям уникального индекса
+        objects = {
+            tuple(getattr(obj, field) for field in index_elements): obj
+            for obj in query_result.scalars().all()
+        }
+        result = []
+        for value in values:
+            obj = objects.get(tuple(value[field] for field in index_elements))
+            if obj is not None:
+                result.append(construct_schema(self.entity_schema, obj))
+        return result
+
+    async def update_many(
+        self, update_entities: Dict[int, BasePydanticModel]
+    ) -> List[DbEntityBaseSchema]:
+        """Обновление объектов по id одним bulk UPDATE
+
+        Args:
+            update_entities (Dict[int, BasePydanticModel]): id -> новые данные объекта
+
+        Returns:
+            List[DbEntityBaseSchema]: объекты в порядке входных данных
+        """
+        if not update_entities:
+            return []
+        try:
+            await self.session.execute(
+                update(self.model),
+                [
+                    {**entity.model_dump(), "id": id}
+                    for id, entity in update_entities.items()
+                ],
+            )
+        except StaleDataError:
+            raise ResourceNotFoundError(
+                f"Not fond {self.model.__name__} with id in {list(update_entities)}!"
+            )
+        stmt = (
+            select(self.model)
+            .where(self.model.id.in_(update_entities.keys()))
+            .execution_options(populate_existing=True)
+        )
+        query_result = await self.session.execute(stmt)
+        objects = {obj.id: obj for obj in query_result.scalars().all()}
+        return [
+            construct_schema(self.entity_schema, objects[id]) for id in update_entities
+        ]
 
     async def update_one(
         self, id: int, update_entity: BasePydanticModel
@@ -103,14 +260,13 @@ class BaseSqlAlchemyRepository(metaclass=RepoTypeCheckedMeta):
         else:
             for name, value in update_entity.model_dump().items():
                 setattr(query_result, name, value)
-            await self.session.commit()
+            await self.session.flush()
 
-            return self.entity_schema.model_validate(query_result)
+            return construct_schema(self.entity_schema, query_result)
 
     async def delete_one(self, id: int) -> int:
         """Удаление объекта"""
         query_result = await self.session.get(self.model, id)
-        await self.session.commit()
         if query_result is None:
             raise ResourceNotFoundError(
                 (
@@ -120,19 +276,101 @@ class BaseSqlAlchemyRepository(metaclass=RepoTypeCheckedMeta):
             )
         else:
             await self.session.delete(query_result)
-            await self.session.commit()
+            await self.session.flush()
             return id
 
-    async def filter_by_field(self, **kwargs) -> List[DbEntityBaseSchema]:
-        """Фильтр любому полю"""
+    def get_filters(self, **kwargs: Any) -> List[ColumnElement[bool]]:
+        """Условия фильтрации по полям модели (None значения пропускаются)"""
         filters = []
         for key, value in kwargs.items():
             if value is not None:
                 filters.append(getattr(self.model, key) == value)
-        stmt = select(self.model).filter(*filters)
+        return filters
+
+    async def filter_by_field(self, **kwargs) -> List[DbEntityBaseSchema]:
+        """Фильтр любому полю"""
+        stmt = select(*self.get_columns()).filter(*self.get_filters(**kwargs))
         query_result = await self.session.execute(stmt)
         result = [
-            self.entity_schema.model_validate(model)
-            for model in query_result.scalars().all()
+            construct_from_row(self.entity_schema, row) for row in query_result.all()
         ]
-        return list(result)
+        return result
+
+    async def stream_by_field(
+        self, batch_size: int = 1000, **kwargs: Any
+    ) -> AsyncIterator[List[DbEntityBaseSchema]]:
+        """Потоковое получение объектов пачками по batch_size (серверный курсор)
+
+        В памяти одновременно находится не больше одной пачки,
+        фильтр по полям как в filter_by_field.
+        """
+        stmt = (
+            select(*self.get_columns())
+            .filter(*self.get_filters(**kwargs))
+            .order_by(self.model.id)
+            .execution_options(yield_per=batch_size)
+        )
+        query_result = await self.session.stream(stmt)
+        async for rows in query_result.partitions():
+            yield [construct_from_row(self.entity_schema, row) for row in rows]
+
+    def stream_all(
+        self, batch_size: int = 1000
+    ) -> AsyncIterator[List[DbEntityBaseSchema]]:
+        """Потоковое получение всех объектов пачками по batch_size"""
+        return self.stream_by_field(batch_size=batch_size)
+
+    async def get_page(
+        self,
+        limit: int,
+        cursor: str | None = None,
+        order_by: Sequence[str] = (),
+        **kwargs: Any,
+    ) -> PageSchema[DbEntityBaseSchema]:
+        """Постраничное получение объектов (keyset пагинация)
+
+        Args:
+            limit (int): размер страницы
+            cursor (str | None): курсор из next_cursor предыдущей страницы
+            order_by (Sequence[str]): поля сортировки, "-field" - по убыванию,
+                id добавляется последним для однозначного порядка
+            **kwargs: фильтр по полям, как в filter_by_field
+        """
+        order_columns = get_order_columns(self.model, order_by)
+        columns = self.get_columns()
+        column_keys = {column.key for column in columns}
+        stmt = (
+            select(
+                *columns,
+                # колонки сортировки нужны для курсора следующей страницы
+                *[
+                    column
+                    for column, _ in order_columns
+                    if column.key not in column_keys
+                ],
+            )
+            .filter(*self.get_filters(**kwargs))
+            .order_by(
+                *[
+                    column.desc() if desc else column.asc()
+                    for column, desc in order_columns
+                ]
+            )
+            .limit(limit + 1)
+        )
+        if cursor:
+            stmt = stmt.where(
+                keyset_filter(order_columns, decode_cursor(order_columns, cursor))
+            )
+        query_result = await self.session.execute(stmt)
+        rows = query_result.all()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(order_columns, rows[-1])
+
+        return PageSchema[self.entity_schema].model_construct(  # type: ignore[name-defined]
+            items=[construct_from_row(self.entity_schema, row) for row in rows],
+            next_cursor=next_cursor,
+        )
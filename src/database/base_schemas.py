@@ -1,5 +1,17 @@
+from typing import Generic, List, TypeVar
+
 from pydantic import BaseModel
 
 
 class DbEntityBaseSchema(BaseModel):
     id: int
+
+
+EntitySchema = TypeVar("EntitySchema", bound=BaseModel)
+
+
+class PageSchema(BaseModel, Generic[EntitySchema]):
+    """Страница объектов, next_cursor - курсор следующей страницы"""
+
+    items: List[EntitySchema]
+    next_cursor: str | None = None
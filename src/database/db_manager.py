@@ -1,25 +1,84 @@
-from typing import AsyncGenerator
+from typing import Any, AsyncGenerator, Dict, Iterator, Sequence
 
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import Pool
 
 from src.core.logger import logger
+from src.core.settings import settings
+from src.database.pool_metrics import (
+    TimedAsyncQueuePool,
+    register_pool_collector,
+    set_pool_name,
+)
+from src.database.query_counter import instrument_engine
+from src.database.routing import ReplicaSelector, ReplicaStrategy, RoutingSession
 
 
 class AsyncPostgresDatabaseManager:
-    """Менеджер по работе с бд"""
+    """Менеджер по работе с бд
 
-    def __init__(self, url: str, echo: bool = False):
+    Если заданы replica_urls, чтения сессий идут в реплики
+    (см. RoutingSession), запись - в основную бд url.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        echo: bool = False,
+        name: str = "default",
+        pool_size: int = 5,
+        max_overflow: int = 10,
+        pool_timeout: float = 30,
+        pool_recycle: int = -1,
+        pool_pre_ping: bool = False,
+        connect_timeout: float = 60,
+        command_timeout: float | None = None,
+        replica_urls: Sequence[str] = (),
+        replica_strategy: ReplicaStrategy = "round_robin",
+    ):
+        engine_options: Dict[str, Any] = {
+            "echo": echo,
+            "poolclass": TimedAsyncQueuePool,
+            "pool_size": pool_size,
+            "max_overflow": max_overflow,
+            "pool_timeout": pool_timeout,
+            "pool_recycle": pool_recycle,
+            "pool_pre_ping": pool_pre_ping,
+            "connect_args": {
+                "timeout": connect_timeout,
+                "command_timeout": command_timeout,
+            },
+        }
         try:
             self.engine = create_async_engine(
-                url=url,
-                echo=echo,
+                url=url, pool_logging_name=name, **engine_options
             )
+            set_pool_name(self.engine, name)
+            self.replica_engines = []
+            for index, replica_url in enumerate(replica_urls):
+                replica_name = f"{name}-replica{index}"
+                replica_engine = create_async_engine(
+                    url=replica_url, pool_logging_name=replica_name, **engine_options
+                )
+                set_pool_name(replica_engine, replica_name)
+                self.replica_engines.append(replica_engine)
             self.session_factory = async_sessionmaker(
                 bind=self.engine,
+                sync_session_class=RoutingSession,
+                info={
+                    "primary": self.engine.sync_engine,
+                    "replica_selector": (
+                        ReplicaSelector(self.replica_engines, replica_strategy)
+                        if self.replica_engines
+                        else None
+                    ),
+                },
                 autoflush=False,
                 autocommit=False,
                 expire_on_commit=False,
             )
+            for engine in [self.engine, *self.replica_engines]:
+                instrument_engine(engine)
             logger.info("PG DB conn success")
         except Exception as e:
             logger.info(f"Err when con {e}")
@@ -29,3 +88,44 @@ class AsyncPostgresDatabaseManager:
             yield session
             logger.debug("session close")
             await session.close()
+
+
+# общие для процесса менеджеры бд: один engine и пул соединений на url
+_db_managers: Dict[str, AsyncPostgresDatabaseManager] = {}
+
+
+def get_db_manager(url: str | None = None) -> AsyncPostgresDatabaseManager:
+    """Менеджер бд для url (по умолчанию основная бд из настроек)
+
+    Настройки пула берутся из ServiceSettings, пул называется host:port/db.
+    """
+    url = url or settings.postgres_url
+    if url not in _db_managers:
+        _db_managers[url] = AsyncPostgresDatabaseManager(
+            url=url,
+            echo=settings.postgres_echo,
+            name=url.rsplit("@", 1)[-1],
+            pool_size=settings.postgres_pool_size,
+            max_overflow=settings.postgres_max_overflow,
+            pool_timeout=settings.postgres_pool_timeout,
+            pool_recycle=settings.postgres_pool_recycle,
+            pool_pre_ping=settings.postgres_pool_pre_ping,
+            connect_timeout=settings.postgres_connect_timeout,
+            command_timeout=settings.postgres_command_timeout,
+            replica_urls=(
+                settings.postgres_replica_urls if url == settings.postgres_url else ()
+            ),
+            replica_strategy=settings.postgres_replica_strategy,
+        )
+    return _db_managers[url]
+
+
+def get_pools() -> Iterator[Pool]:
+    """Пулы соединений всех менеджеров бд"""
+    for db_manager in _db_managers.values():
+        yield db_manager.engine.pool
+        for replica_engine in db_manager.replica_engines:
+            yield replica_engine.pool
+
+
+register_pool_collector(get_pools)
@@ -0,0 +1,62 @@
+"""Создание DTO из данных бд без повторной валидации
+
+Данные, прочитанные из бд, уже типизированы драйвером, поэтому схемы
+собираются через model_construct. Валидация нужна только для входных данных.
+"""
+
+from functools import lru_cache
+from typing import Any, Tuple, TypeVar
+
+from pydantic import BaseModel
+from sqlalchemy import Row, inspect
+from sqlalchemy.orm import InstrumentedAttribute
+
+from src.database.base_model import BaseSqlAlchemyModel
+
+Schema = TypeVar("Schema", bound=BaseModel)
+
+
+@lru_cache(maxsize=None)
+def get_schema_columns(
+    schema: type[BaseModel], model: type[BaseSqlAlchemyModel]
+) -> Tuple[InstrumentedAttribute[Any], ...]:
+    """Колонки модели, соответствующие полям схемы (для select без лишних колонок)"""
+    column_keys = {attr.key for attr in inspect(model).column_attrs}
+    return tuple(
+        getattr(model, name) for name in schema.model_fields if name in column_keys
+    )
+
+
+@lru_cache(maxsize=None)
+def _get_source_fields(schema: type[BaseModel], source_type: type) -> Tuple[str, ...]:
+    """Поля схемы, которые можно взять из объекта source_type
+
+    У ORM объектов берутся только колонки, чтобы не вызвать lazy загрузку связей.
+    """
+    mapper = inspect(source_type, raiseerr=False)
+    if mapper is not None:
+        source_fields = {attr.key for attr in mapper.column_attrs}
+    else:
+        source_fields = set(source_type.model_fields)
+    return tuple(name for name in schema.model_fields if name in source_fields)
+
+
+def construct_schema(schema: type[Schema], source: Any, **fields: Any) -> Schema:
+    """DTO из ORM объекта или другой схемы без валидации
+
+    Args:
+        schema (type[Schema]): класс DTO
+        source (Any): ORM объект или pydantic модель с данными из бд
+        **fields: значения остальных полей (связи, статистика), уже собранные DTO
+    """
+    values = {
+        name: getattr(source, name)
+        for name in _get_source_fields(schema, type(source))
+        if name not in fields
+    }
+    return schema.model_construct(**values, **fields)
+
+
+def construct_from_row(schema: type[Schema], row: Row[Any], **fields: Any) -> Schema:
+    """DTO из строки select по колонкам без валидации"""
+    return schema.model_construct(**{**row._mapping, **fields})
@@ -0,0 +1,59 @@
+"""unique lesson step result per user
+
+Revision ID: 17ad97798972
+Revises: 1da4e44be7ce
+Create Date: 2026-10-18 07:20:11.204913
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "17ad97798972"
+down_revision: Union[str, None] = "1da4e44be7ce"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# дубли результатов (user_id, lesson_step_id): оставляем последний результат,
+# тайминги дублей переносим на него
+MOVE_DUPLICATE_TIMINGS = """
+    UPDATE lesson_step_timings AS t
+    SET lesson_step_result_id = d.keep_id
+    FROM (
+        SELECT id, max(id) OVER (PARTITION BY user_id, lesson_step_id) AS keep_id
+        FROM lesson_step_results
+    ) AS d
+    WHERE t.lesson_step_result_id = d.id AND d.id <> d.keep_id
+"""
+DELETE_DUPLICATE_RESULTS = """
+    DELETE FROM lesson_step_results AS r
+    USING (
+        SELECT id, max(id) OVER (PARTITION BY user_id, lesson_step_id) AS keep_id
+        FROM lesson_step_results
+    ) AS d
+    WHERE r.id = d.id AND d.id <> d.keep_id
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(MOVE_DUPLICATE_TIMINGS)
+    op.execute(DELETE_DUPLICATE_RESULTS)
+    op.create_index(
+        "ix_lesson_step_results_user_id_lesson_step_id",
+        "lesson_step_results",
+        ["user_id", "lesson_step_id"],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        "ix_lesson_step_results_user_id_lesson_step_id",
+        table_name="lesson_step_results",
+    )
@@ -0,0 +1,115 @@
+"""Keyset (cursor) пагинация для репозиториев"""
+
+import base64
+import binascii
+import json
+from typing import Any, List, Sequence, Tuple
+
+from pydantic import TypeAdapter, ValidationError
+from pydantic_core import to_jsonable_python
+from sqlalchemy import ColumnElement, and_, or_
+from sqlalchemy.orm import ColumnProperty, InstrumentedAttribute
+
+from src.core.errors import BadRequestError
+from src.database.base_model import BaseSqlAlchemyModel
+
+# колонка сортировки и признак сортировки по убыванию
+OrderColumn = Tuple[InstrumentedAttribute[Any], bool]
+
+
+def parse_order_by(order_by: str | None) -> List[str]:
+    """Разбор параметра сортировки вида "-name,language" в список полей"""
+    if not order_by:
+        return []
+    return [field.strip() for field in order_by.split(",") if field.strip()]
+
+
+def get_order_columns(
+    model: type[BaseSqlAlchemyModel], order_by: Sequence[str]
+) -> List[OrderColumn]:
+    """Колонки сортировки модели, id всегда последняя колонка
+
+    Поля с префиксом "-" сортируются по убыванию.
+    id можно указать только последним полем (например "-id" - сначала новые),
+    иначе он добавляется по возрастанию.
+    Сортировка допустима только по not null колонкам,
+    иначе условие keyset пагинации будет некорректным.
+    """
+    order_columns: List[OrderColumn] = []
+    id_desc = False
+    for index, field in enumerate(order_by):
+        desc = field.startswith("-")
+        name = field.lstrip("-")
+        if name == "id":
+            if index != len(order_by) - 1:
+                raise BadRequestError("Поле 'id' должно быть последним в сортировке")
+            id_desc = desc
+            continue
+        column = getattr(model, name, None)
+        if not isinstance(column, InstrumentedAttribute) or not isinstance(
+            column.property, ColumnProperty
+        ):
+            raise BadRequestError(f"Сортировка по полю '{name}' не поддерживается")
+        if column.expression.nullable:
+            raise BadRequestError(f"Сортировка по nullable полю '{name}' невозможна")
+        order_columns.append((column, desc))
+    order_columns.append((model.id, id_desc))
+    return order_columns
+
+
+def order_columns_spec(order_columns: Sequence[OrderColumn]) -> List[str]:
+    """Описание сортировки для сохранения в курсоре"""
+    return [("-" if desc else "") + column.key for column, desc in order_columns]
+
+
+def encode_cursor(order_columns: Sequence[OrderColumn], obj: Any) -> str:
+    """Непрозрачный курсор на позицию после объекта obj"""
+    payload = {
+        "o": order_columns_spec(order_columns),
+        "v": [getattr(obj, column.key) for column, _ in order_columns],
+    }
+    raw = json.dumps(to_jsonable_python(payload), separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(order_columns: Sequence[OrderColumn], cursor: str) -> List[Any]:
+    """Значения колонок сортировки из курсора"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        spec, values = payload["o"], payload["v"]
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise BadRequestError("Невалидный курсор")
+
+    if (
+        spec != order_columns_spec(order_columns)
+        or not isinstance(values, list)
+        or len(values) != len(spec)
+    ):
+        raise BadRequestError("Курсор не соответствует сортировке")
+
+    try:
+        return [
+            TypeAdapter(column.type.python_type).validate_python(value)
+            for (column, _), value in zip(order_columns, values)
+        ]
+    except ValidationError:
+        raise BadRequestError("Невалидный курсор")
+
+
+def keyset_filter(
+    order_columns: Sequence[OrderColumn], values: Sequence[Any]
+) -> ColumnElement[bool]:
+    """Условие выборки строк после позиции курсора
+
+    (a > va) OR (a = va AND b > vb) OR ... с учетом направления сортировки.
+    """
+    clauses = []
+    for index, (column, desc) in enumerate(order_columns):
+        previous = [
+            prev_column == value
+            for (prev_column, _), value in zip(order_columns[:index], values)
+        ]
+        compare = column < values[index] if desc else column > values[index]
+        clauses.append(and_(*previous, compare))
+    return or_(*clauses)
@@ -0,0 +1,97 @@
+"""Метрики пула соединений с бд"""
+
+import time
+from typing import Callable, Iterable, Iterator, cast
+
+from prometheus_client import REGISTRY, Histogram
+from prometheus_client.core import GaugeMetricFamily, Metric
+from prometheus_client.registry import Collector
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry, Pool
+from sqlalchemy.util.queue import AsyncAdaptedQueue
+
+POOL_QUEUE_WAIT = Histogram(
+    "db_pool_queue_wait_seconds",
+    "Время ожидания свободного соединения в очереди пула",
+    ["pool"],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+
+class TimedAsyncQueue(AsyncAdaptedQueue[ConnectionPoolEntry]):
+    """Очередь соединений пула, замеряющая ожидание свободного соединения
+
+    Открытие нового соединения (overflow) в замер не попадает.
+    """
+
+    pool_name = "default"
+
+    def get(
+        self, block: bool = True, timeout: float | None = None
+    ) -> ConnectionPoolEntry:
+        start_time = time.perf_counter()
+        try:
+            return super().get(block, timeout)
+        finally:
+            POOL_QUEUE_WAIT.labels(pool=self.pool_name).observe(
+                time.perf_counter() - start_time
+            )
+
+
+class TimedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """Пул, замеряющий время ожидания свободного соединения"""
+
+    _queue_class = TimedAsyncQueue
+    _pool: TimedAsyncQueue
+
+    @property
+    def name(self) -> str:
+        """Имя пула в метриках"""
+        return self._pool.pool_name
+
+    @name.setter
+    def name(self, name: str) -> None:
+        self._pool.pool_name = name
+
+    def recreate(self) -> "TimedAsyncQueuePool":
+        pool = cast(TimedAsyncQueuePool, super().recreate())
+        pool.name = self.name
+        return pool
+
+
+def set_pool_name(engine: AsyncEngine, name: str) -> None:
+    """Имя пула engine для метрик (сохраняется при пересоздании пула)"""
+    pool = engine.sync_engine.pool
+    if isinstance(pool, TimedAsyncQueuePool):
+        pool.name = name
+
+
+class PoolCollector(Collector):
+    """Текущее состояние пулов соединений: размер, занятые и overflow соединения"""
+
+    def __init__(self, get_pools: Callable[[], Iterable[Pool]]):
+        self.get_pools = get_pools
+
+    def collect(self) -> Iterator[Metric]:
+        size = GaugeMetricFamily("db_pool_size", "Размер пула", labels=["pool"])
+        in_use = GaugeMetricFamily(
+            "db_pool_checked_out", "Соединения, выданные из пула", labels=["pool"]
+        )
+        overflow = GaugeMetricFamily(
+            "db_pool_overflow", "Соединения сверх размера пула", labels=["pool"]
+        )
+        for pool in self.get_pools():
+            if not isinstance(pool, TimedAsyncQueuePool):
+                continue
+            name = pool.name
+            size.add_metric([name], pool.size())
+            in_use.add_metric([name], pool.checkedout())
+            overflow.add_metric([name], max(pool.overflow(), 0))
+        yield size
+        yield in_use
+        yield overflow
+
+
+def register_pool_collector(get_pools: Callable[[], Iterable[Pool]]) -> None:
+    """Регистрация метрик пулов в prometheus"""
+    REGISTRY.register(PoolCollector(get_pools))
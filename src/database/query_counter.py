@@ -0,0 +1,121 @@
+"""Подсчет SQL запросов в рамках http запроса и поиск N+1"""
+
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Iterator, List
+
+from prometheus_client import Histogram
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+DB_QUERIES = Histogram(
+    "http_request_db_queries",
+    "Количество SQL запросов на http запрос",
+    ["method", "handler"],
+    buckets=(1, 2, 3, 5, 10, 20, 50, 100, 250, 500),
+)
+DB_TIME = Histogram(
+    "http_request_db_duration_seconds",
+    "Суммарное время SQL запросов на http запрос",
+    ["method", "handler"],
+)
+
+_PARAMS_LIST = re.compile(
+    r"\(\s*(?:\$\d+|%\(\w+\)s)(?:\s*,\s*(?:\$\d+|%\(\w+\)s))*\s*\)"
+)
+_PARAM = re.compile(r"\$\d+|%\(\w+\)s")
+_SPACES = re.compile(r"\s+")
+
+
+def get_statement_shape(statement: str) -> str:
+    """Форма запроса без параметров: одинакова для запросов N+1"""
+    shape = _PARAMS_LIST.sub("(...)", statement)
+    shape = _PARAM.sub("?", shape)
+    return _SPACES.sub(" ", shape).strip()
+
+
+@dataclass
+class QueryStats:
+    """Статистика SQL запросов"""
+
+    count: int = 0
+    duration: float = 0.0
+    shapes: Counter[str] = field(default_factory=Counter)
+
+    def add(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.duration += duration
+        self.shapes[get_statement_shape(statement)] += 1
+
+    def most_repeated(self) -> tuple[str, int] | None:
+        """Самый часто повторяющийся запрос и количество повторов"""
+        most_common = self.shapes.most_common(1)
+        return most_common[0] if most_common else None
+
+
+_query_stats: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """Сбор статистики SQL запросов, выполненных внутри блока
+
+    Контекст наследуется задачами и зависимостями запроса,
+    поэтому блок достаточно открыть в middleware.
+    """
+    stats = QueryStats()
+    token = _query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _query_stats.reset(token)
+
+
+def _before_cursor_execute(conn: Any, *args: Any) -> None:
+    conn.info["query_start_time"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+    stats = _query_stats.get()
+    if stats is not None:
+        stats.add(statement, time.perf_counter() - conn.info["query_start_time"])
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Подключение подсчета запросов к engine"""
+    sync_engine: Engine = engine.sync_engine
+    if event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def observe_request_queries(method: str, handler: str, stats: QueryStats) -> None:
+    """Запись статистики запросов в метрики prometheus"""
+    DB_QUERIES.labels(method=method, handler=handler).observe(stats.count)
+    DB_TIME.labels(method=method, handler=handler).observe(stats.duration)
+
+
+@contextmanager
+def count_queries() -> Iterator[List[str]]:
+    """Все SQL запросы любых engine внутри блока (в том числе из других потоков)
+
+    Используется в тестах для проверки бюджета запросов эндпоинта.
+    """
+    statements: List[str] = []
+
+    def before_cursor_execute(
+        conn: Any, cursor: Any, statement: str, *args: Any
+    ) -> None:
+        statements.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(Engine, "before_cursor_execute", before_cursor_execute)
@@ -0,0 +1,108 @@
+"""Маршрутизация запросов сессии между основной бд и репликами"""
+
+import itertools
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Iterator, Literal, Sequence
+
+from sqlalchemy import Delete, Insert, Select, Update, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import Session
+
+ReplicaStrategy = Literal["round_robin", "least_connections"]
+
+# ключ session.info: сессия работает только с основной бд
+USE_PRIMARY = "use_primary"
+
+
+class ReplicaSelector:
+    """Выбор реплики для чтения"""
+
+    def __init__(
+        self,
+        replicas: Sequence[AsyncEngine],
+        strategy: ReplicaStrategy = "round_robin",
+    ):
+        self.replicas = [replica.sync_engine for replica in replicas]
+        self.strategy = strategy
+        self._next = itertools.cycle(self.replicas)
+
+    def select(self) -> Engine:
+        if self.strategy == "least_connections":
+            return min(self.replicas, key=lambda engine: engine.pool.checkedout())
+        return next(self._next)
+
+
+@dataclass
+class RoutingState:
+    """Состояние маршрутизации http запроса"""
+
+    use_primary: bool = False  # запрос читает только из основной бд
+    wrote: bool = False  # запрос записывал в бд
+
+
+_routing_state: ContextVar[RoutingState | None] = ContextVar(
+    "routing_state", default=None
+)
+
+
+@contextmanager
+def route_request(use_primary: bool = False) -> Iterator[RoutingState]:
+    """Общее для сессий http запроса состояние маршрутизации
+
+    После первой записи все чтения запроса идут в основную бд.
+    """
+    state = RoutingState(use_primary=use_primary)
+    token = _routing_state.set(state)
+    try:
+        yield state
+    finally:
+        _routing_state.reset(token)
+
+
+def use_primary(session: Session) -> None:
+    """Переключение сессии и http запроса на основную бд после записи"""
+    session.info[USE_PRIMARY] = True
+    state = _routing_state.get()
+    if state is not None:
+        state.use_primary = state.wrote = True
+
+
+class RoutingSession(Session):
+    """Сессия, читающая из реплик, если они настроены
+
+    Запись, flush и запросы в блоке UnitOfWork идут в основную бд:
+    перед flush сессия переключается на основную бд событием before_flush.
+    Запросы, которые нельзя однозначно отнести к чтению (text), тоже.
+    """
+
+    def get_bind(  # type: ignore[override]
+        self,
+        mapper: Any = None,
+        *,
+        clause: Any = None,
+        **kw: Any,
+    ) -> Engine:
+        primary: Engine = self.info["primary"]
+        selector: ReplicaSelector | None = self.info.get("replica_selector")
+        state = _routing_state.get()
+
+        if isinstance(clause, (Insert, Update, Delete)):
+            use_primary(self)
+            return primary
+
+        if (
+            selector is None
+            or not isinstance(clause, Select)
+            or self.info.get(USE_PRIMARY)
+            or (state is not None and state.use_primary)
+        ):
+            return primary
+        return selector.select()
+
+
+@event.listens_for(RoutingSession, "before_flush")
+def _use_primary_before_flush(session: Session, *args: Any) -> None:
+    use_primary(session)
@@ -0,0 +1,51 @@
+from types import TracebackType
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.routing import USE_PRIMARY
+
+# ключ session.info: глубина вложенности блоков UnitOfWork сессии
+UOW_DEPTH = "uow_depth"
+
+
+class UnitOfWork:
+    """Единица работы поверх сессии запроса
+
+    Репозитории только делают flush, commit выполняется один раз
+    при выходе из внешнего блока ``async with uow``, при ошибке - rollback.
+    Вложенные блоки не коммитят, поэтому сервисы можно вызывать друг из друга.
+    Глубина хранится в session.info, поэтому это верно и для разных
+    UnitOfWork (сервисов) на одной сессии запроса.
+    Внутри блока сессия читает только из основной бд.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def __aenter__(self) -> "UnitOfWork":
+        self.session.info[UOW_DEPTH] = self.session.info.get(UOW_DEPTH, 0) + 1
+        self.session.info[USE_PRIMARY] = True
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        depth = self.session.info[UOW_DEPTH] - 1
+        self.session.info[UOW_DEPTH] = depth
+        if depth:
+            return
+        if exc_type is None:
+            await self.commit()
+        else:
+            await self.rollback()
+
+    async def commit(self) -> None:
+        """Фиксация транзакции"""
+        await self.session.commit()
+
+    async def rollback(self) -> None:
+        """Откат транзакции"""
+        await self.session.rollback()
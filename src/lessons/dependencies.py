@@ -4,6 +4,7 @@ from fastapi import Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.core.dependencies import get_session
+from src.database.unit_of_work import UnitOfWork
 from src.lessons.repository import (
     LessonsRepository,
     LessonsStepRepository,
@@ -29,5 +30,6 @@ async def get_lesson_service_dep(
         lesson_step_result_repo=lesson_step_result_repo,
         lesson_step_timing_repo=lesson_step_timing_repo,
         lesson_step_text_repo=lesson_step_text_repo,
+        uow=UnitOfWork(session),
     )
     return service
@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import List
 
-from sqlalchemy import ForeignKey, func
+from sqlalchemy import ForeignKey, Index, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from src.database.base_model import BaseSqlAlchemyModel
@@ -30,6 +30,10 @@ class LessonStepModel(BaseSqlAlchemyModel):
     """Этап урока по обучению печати"""
 
     __tablename__ = "lesson_steps"
+    __table_args__ = (
+        # количество шагов урока считается по индексу без чтения таблицы
+        Index("ix_lesson_steps_lesson_id", "lesson_id", postgresql_include=["id"]),
+    )
     name: Mapped[str]
     description: Mapped[str] = mapped_column(nullable=True)
 
@@ -52,6 +56,7 @@ class LessonStepTextModel(BaseSqlAlchemyModel):
     """Текст этапа урока"""
 
     __tablename__ = "lesson_step_texts"
+    __table_args__ = (Index("ix_lesson_step_texts_lesson_step_id", "lesson_step_id"),)
     name: Mapped[str] = mapped_column(nullable=True)
     text: Mapped[str] = mapped_column(nullable=True)
     lesson_step_id: Mapped[int] = mapped_column(ForeignKey("lesson_steps.id"))
@@ -65,6 +70,21 @@ class LessonStepResultModel(BaseSqlAlchemyModel):
     """Результаты этапа урока"""
 
     __tablename__ = "lesson_step_results"
+    __table_args__ = (
+        # один результат пользователя на шаг урока, используется для upsert
+        Index(
+            "ix_lesson_step_results_user_id_lesson_step_id",
+            "user_id",
+            "lesson_step_id",
+            unique=True,
+        ),
+        # статистика по шагам (количество пользователей) по индексу
+        Index(
+            "ix_lesson_step_results_lesson_step_id",
+            "lesson_step_id",
+            postgresql_include=["user_id"],
+        ),
+    )
     percentage: Mapped[int] = mapped_column(nullable=True)
     wpm: Mapped[int] = mapped_column(nullable=True)
     status: Mapped[str] = mapped_column(
@@ -89,6 +109,14 @@ class LessonStepTimingModel(BaseSqlAlchemyModel):
     """Временные результаты прохождения этапа урока"""
 
     __tablename__ = "lesson_step_timings"
+    __table_args__ = (
+        # сумма и лучшее время результата по индексу
+        Index(
+            "ix_lesson_step_timings_lesson_step_result_id",
+            "lesson_step_result_id",
+            postgresql_include=["seconds"],
+        ),
+    )
     seconds: Mapped[int] = mapped_column(nullable=True)
     created_date: Mapped[datetime] = mapped_column(server_default=func.now())
 
@@ -1,10 +1,12 @@
-from typing import List
+from typing import Dict, List
 
-from sqlalchemy import select
+from sqlalchemy import Integer, func, insert, literal, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import joinedload
 
 from src.core.errors import ResourceNotFoundError
-from src.database.base_repository import BaseSqlAlchemyRepository
+from src.database.base_repository import BaseSqlAlchemyRepository, LoadStrategy
+from src.database.dto import construct_from_row, construct_schema, get_schema_columns
 from src.lessons.models import (
     LessonModel,
     LessonStepModel,
@@ -19,10 +21,13 @@ from src.lessons.schemas import (
     CreateLessonStepTextSchema,
     CreateLessonStepTimingSchema,
     LessonBaseSchema,
+    LessonResultSchema,
     LessonSchema,
+    LessonStatsSchema,
     LessonStepBaseSchema,
     LessonStepResultSchema,
     LessonStepSchema,
+    LessonStepStatsSchema,
     LessonStepTextSchema,
     LessonStepTimingSchema,
     UpdateLessonSchema,
@@ -44,37 +49,105 @@ class LessonsRepository(BaseSqlAlchemyRepository):
     async def get_all_lessons(self) -> List[LessonSchema]:
         """Получение всех уроков"""
 
-        stmt = select(self.model)
+        stmt = select(*get_schema_columns(LessonSchema, self.model))
+        query_result = await self.session.execute(stmt)
+
+        result = [construct_from_row(LessonSchema, row) for row in query_result.all()]
+
+        return result
+
+    async def get_all_lessons_with_steps(
+        self, load_strategy: LoadStrategy | None = None
+    ) -> List[LessonSchema]:
+        """Получение всех уроков с этапами и их текстами"""
+        load = self.get_loader(load_strategy)
+        stmt = select(self.model).options(
+            load(self.model.steps).options(load(LessonStepModel.texts))
+        )
         obj_list = await self.session.execute(stmt)
 
         result = [
-            LessonSchema.model_validate({**lesson.__dict__, "result": None})
+            construct_schema(
+                LessonSchema,
+                lesson,
+                steps=[
+                    construct_schema(
+                        LessonStepSchema,
+                        step,
+                        texts=[text.text for text in step.texts],
+                    )
+                    for step in lesson.steps
+                ],
+            )
             for lesson in obj_list.unique().scalars().all()
         ]
 
         return result
 
+    async def get_lessons_stats(
+        self, lesson_id: int | None = None
+    ) -> Dict[int, LessonStatsSchema]:
+        """Статистика по урокам (количество шагов и пользователей) одним запросом
+
+        Уроки без шагов в результат не попадают.
+        """
+        stmt = (
+            select(
+                LessonStepModel.lesson_id,
+                func.count(LessonStepModel.id.distinct()).label("steps_count"),
+                func.count(LessonStepResultModel.user_id.distinct()).label(
+                    "users_count"
+                ),
+            )
+            .outerjoin(
+                LessonStepResultModel,
+                LessonStepResultModel.lesson_step_id == LessonStepModel.id,
+            )
+            .group_by(LessonStepModel.lesson_id)
+        )
+        if lesson_id is not None:
+            stmt = stmt.where(LessonStepModel.lesson_id == lesson_id)
+        query_result = await self.session.execute(stmt)
+
+        result = {
+            row.lesson_id: LessonStatsSchema.model_construct(
+                steps_count=row.steps_count,
+                users_count=row.users_count,
+            )
+            for row in query_result.all()
+        }
+        return result
+
     async def get_one_lesson_with_steps(
-        self, lesson_id: int, user_id: int | None
+        self,
+        lesson_id: int,
+        user_id: int | None,
+        load_strategy: LoadStrategy | None = None,
     ) -> LessonSchema:
-        """Получение урока с этапами и их результатми"""
+        """Получение урока с этапами и их результатми
+
+        Args:
+            lesson_id (int): id урока
+            user_id (int | None): id пользователя, чьи результаты нужно подгрузить
+            load_strategy (LoadStrategy | None): стратегия загрузки связей,
+                по умолчанию стратегия репозитория (selectin)
+        """
+        load = self.get_loader(load_strategy)
+        step_options = [load(LessonStepModel.texts)]
         if user_id:
-            stmt = (
-                select(self.model)
-                .options(
-                    joinedload(self.model.steps)
-                    .joinedload(LessonStepModel.results)
-                    .options(joinedload(LessonStepResultModel.timings)),
-                    joinedload(self.model.steps).joinedload(LessonStepModel.texts),
-                )
-                .where(self.model.id == lesson_id)
-            )
-        else:
-            stmt = (
-                select(self.model)
-                .options(joinedload(self.model.steps).joinedload(LessonStepModel.texts))
-                .where(self.model.id == lesson_id)
+            # подгружаем результаты и тайминги только текущего пользователя
+            step_options.append(
+                load(
+                    LessonStepModel.results.and_(
+                        LessonStepResultModel.user_id == user_id
+                    )
+                ).options(load(LessonStepResultModel.timings))
             )
+        stmt = (
+            select(self.model)
+            .options(load(self.model.steps).options(*step_options))
+            .where(self.model.id == lesson_id)
+        )
 
         obj_list = await self.session.execute(stmt)
 
@@ -84,33 +157,28 @@ class LessonsRepository(BaseSqlAlchemyRepository):
         else:
             raise ResourceNotFoundError("Lesson not found")
 
-        result = LessonSchema.model_validate(
-            {
-                **lesson.__dict__,
-                "result": None,
-                "steps": [
-                    LessonStepSchema.model_validate(
-                        {
-                            **step.__dict__,
-                            "texts": [text.text for text in step.texts],
-                            "result": (
-                                LessonStepResultSchema.model_validate(
-                                    {
-                                        **step.results[0].__dict__,
-                                        "timing_list": [
-                                            timing.seconds
-                                            for timing in step.results[0].timings
-                                        ],
-                                    }
-                                )
-                                if user_id and step.results
-                                else None
-                            ),
-                        }
-                    )
-                    for step in lesson.steps
-                ],
-            }
+        result = construct_schema(
+            LessonSchema,
+            lesson,
+            steps=[
+                construct_schema(
+                    LessonStepSchema,
+                    step,
+                    texts=[text.text for text in step.texts],
+                    result=(
+                        construct_schema(
+                            LessonStepResultSchema,
+                            step.results[0],
+                            timing_list=[
+                                timing.seconds for timing in step.results[0].timings
+                            ],
+                        )
+                        if user_id and step.results
+                        else None
+                    ),
+                )
+                for step in lesson.steps
+            ],
         )
 
         return result
@@ -124,11 +192,14 @@ class LessonsStepRepository(BaseSqlAlchemyRepository):
     create_schema = CreateLessonStepSchema
     update_schema = UpdateLessonStepSchema
 
-    async def get_lesson_step_with_texts(self, step_id: int) -> LessonStepSchema:
+    async def get_lesson_step_with_texts(
+        self, step_id: int, load_strategy: LoadStrategy | None = None
+    ) -> LessonStepSchema:
         """Получение всех уроков с результатами пользователя"""
+        load = self.get_loader(load_strategy)
         stmt = (
             select(self.model)
-            .options(joinedload(self.model.texts))
+            .options(load(self.model.texts))
             .where(self.model.id == step_id)
         )
         obj_list = await self.session.execute(stmt)
@@ -140,15 +211,45 @@ class LessonsStepRepository(BaseSqlAlchemyRepository):
         else:
             raise ResourceNotFoundError("Lesson not found")
 
-        result = LessonStepSchema.model_validate(
-            {
-                **step.__dict__,
-                "texts": [text.text for text in step.texts],
-            }
+        result = construct_schema(
+            LessonStepSchema,
+            step,
+            texts=[text.text for text in step.texts],
         )
 
         return result
 
+    async def get_steps_stats(
+        self, lesson_id: int | None = None, step_id: int | None = None
+    ) -> Dict[int, LessonStepStatsSchema]:
+        """Статистика по шагам уроков (количество пользователей) одним запросом
+
+        Шаги без результатов в результат не попадают.
+        """
+        stmt = (
+            select(
+                LessonStepResultModel.lesson_step_id,
+                func.count(LessonStepResultModel.user_id.distinct()).label(
+                    "users_count"
+                ),
+            )
+            .join(self.model, LessonStepResultModel.lesson_step_id == self.model.id)
+            .group_by(LessonStepResultModel.lesson_step_id)
+        )
+        if lesson_id is not None:
+            stmt = stmt.where(self.model.lesson_id == lesson_id)
+        if step_id is not None:
+            stmt = stmt.where(LessonStepResultModel.lesson_step_id == step_id)
+        query_result = await self.session.execute(stmt)
+
+        result = {
+            row.lesson_step_id: LessonStepStatsSchema.model_construct(
+                users_count=row.users_count
+            )
+            for row in query_result.all()
+        }
+        return result
+
 
 class LessonsStepResultRepository(BaseSqlAlchemyRepository):
     """Репозиторий для управления данными о рузультатах шага урока"""
@@ -177,21 +278,122 @@ class LessonsStepResultRepository(BaseSqlAlchemyRepository):
         query_result = obj_list.unique().scalars().all()
 
         result = [
-            LessonStepResultSchema.model_validate(
-                {
-                    **result.__dict__,
-                    "timing_list": (
-                        [timing.seconds for timing in result.timings if timing.seconds]
-                        if result.timings
-                        else None
-                    ),
-                }
+            construct_schema(
+                LessonStepResultSchema,
+                result,
+                timing_list=[timing.seconds for timing in result.timings],
             )
             for result in query_result
         ]
 
         return result
 
+    async def get_lessons_results_by_user(
+        self,
+        user_id: int,
+        lesson_id: int | None = None,
+    ) -> Dict[int, LessonResultSchema]:
+        """Сводные результаты пользователя по урокам одним запросом
+
+        Возвращает словарь lesson_id -> LessonResultSchema только для уроков,
+        в которых у пользователя есть результаты.
+        """
+        # тайминги результата: сумма и лучшее время (нулевые значения не учитываются)
+        timing_seconds = func.nullif(LessonStepTimingModel.seconds, 0)
+        result_timings = (
+            select(
+                self.model.id.label("result_id"),
+                LessonStepModel.lesson_id.label("lesson_id"),
+                func.coalesce(self.model.wpm, 0).label("wpm"),
+                func.sum(timing_seconds).label("time_spent"),
+                func.min(timing_seconds).label("time_best"),
+            )
+            .join(LessonStepModel, self.model.lesson_step_id == LessonStepModel.id)
+            .outerjoin(
+                LessonStepTimingModel,
+                LessonStepTimingModel.lesson_step_result_id == self.model.id,
+            )
+            .where(self.model.user_id == user_id)
+            .group_by(self.model.id, LessonStepModel.lesson_id)
+        )
+        if lesson_id is not None:
+            result_timings = result_timings.where(
+                LessonStepModel.lesson_id == lesson_id
+            )
+        result_timings = result_timings.subquery()
+
+        lesson_steps = (
+            select(
+                LessonStepModel.lesson_id.label("lesson_id"),
+                func.count(LessonStepModel.id).label("steps_count"),
+            )
+            .group_by(LessonStepModel.lesson_id)
+            .subquery()
+        )
+
+        stmt = (
+            select(
+                result_timings.c.lesson_id,
+                lesson_steps.c.steps_count,
+                func.count(result_timings.c.result_id).label("results_count"),
+                func.sum(result_timings.c.wpm).label("wpm_sum"),
+                func.sum(result_timings.c.time_spent).label("time_spent"),
+                func.sum(result_timings.c.time_best).label("time_best"),
+            )
+            .join(lesson_steps, lesson_steps.c.lesson_id == result_timings.c.lesson_id)
+            .group_by(result_timings.c.lesson_id, lesson_steps.c.steps_count)
+        )
+        query_result = await self.session.execute(stmt)
+
+        result = {}
+        for row in query_result.all():
+            result[row.lesson_id] = LessonResultSchema.model_construct(
+                lesson_id=row.lesson_id,
+                user_id=user_id,
+                percentage=int((row.results_count / row.steps_count) * 100),
+                average_wpm=int(row.wpm_sum / row.results_count),
+                total_time_spent=int(row.time_spent or 0),
+                total_time_best=int(row.time_best or 0),
+            )
+        return result
+
+    async def upsert_result_with_timing(
+        self,
+        new_result: CreateLessonStepResultSchema,
+        timing: int | None = None,
+    ) -> int:
+        """Создание или обновление результата шага урока вместе с таймингом
+
+        Один запрос INSERT ... ON CONFLICT DO UPDATE по уникальному индексу
+        (user_id, lesson_step_id), тайминг добавляется в том же запросе через CTE.
+        Возвращает id результата.
+        """
+        upsert_stmt = pg_insert(self.model).values(**new_result.model_dump())
+        upsert_stmt = upsert_stmt.on_conflict_do_update(
+            index_elements=[self.model.user_id, self.model.lesson_step_id],
+            set_={
+                "percentage": upsert_stmt.excluded.percentage,
+                "status": upsert_stmt.excluded.status,
+                "wpm": upsert_stmt.excluded.wpm,
+            },
+        ).returning(self.model.id)
+
+        if timing:
+            step_result = upsert_stmt.cte("step_result")
+            stmt = (
+                insert(LessonStepTimingModel)
+                .from_select(
+                    ["seconds", "lesson_step_result_id"],
+                    select(literal(timing, Integer), step_result.c.id),
+                )
+                .returning(LessonStepTimingModel.lesson_step_result_id)
+            )
+        else:
+            stmt = upsert_stmt
+
+        query_result = await self.session.execute(stmt)
+        return query_result.scalar_one()
+
     async def get_users_with_lesson_step_result(self, step_id: int) -> LessonStepSchema:
         """Получение всех пользователей, кто проходил шаг урока"""
         stmt = (
@@ -1,4 +1,4 @@
-from typing import List, Any
+from typing import Dict, List, Any
 
 from pydantic import BaseModel, ConfigDict
 
@@ -161,6 +161,12 @@ class LessonResultSchema(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+# прогресс пользователя по уроку, кэшируется отдельно от общего содержимого урока
+class LessonProgressSchema(BaseModel):
+    result: LessonResultSchema
+    steps: Dict[int, LessonStepResultSchema] = {}  # lesson_step_id -> результат
+
+
 class LessonBaseSchema(DbEntityBaseSchema):
     name: str | None = None
     description: str | None = None
@@ -1,5 +1,24 @@
-from typing import List
+import hashlib
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Sequence,
+    TypeVar,
+)
+
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.core.cache import cached_value
+from src.core.schemas import PaginationForm
+from src.core.settings import settings
+from src.database.base_schemas import PageSchema
+from src.database.db_manager import get_db_manager
+from src.database.dto import construct_schema
+from src.database.unit_of_work import UnitOfWork
 from src.lessons.repository import (
     LessonsRepository,
     LessonsStepRepository,
@@ -13,18 +32,20 @@ from src.lessons.schemas import (
     CreateLessonStepResultSchema,
     CreateLessonStepSchema,
     CreateLessonStepTextSchema,
-    CreateLessonStepTimingSchema,
+    LessonProgressSchema,
     LessonResultSchema,
     LessonSchema,
     LessonStatsSchema,
     LessonStepResultSchema,
     LessonStepSchema,
     LessonStepStatsSchema,
+    LessonStepTimingSchema,
     SetLessonStepResultForm,
-    UpdateLessonStepResultSchema,
 )
 from src.users.schemas import UserLessonsStats
 
+T = TypeVar("T")
+
 
 class LessonsService:
     """Сервис управления уроками"""
@@ -36,16 +57,67 @@ class LessonsService:
         lesson_step_result_repo: LessonsStepResultRepository,
         lesson_step_timing_repo: LessonsStepTimingRepository,
         lesson_step_text_repo: LessonStepTextRepository,
+        uow: UnitOfWork,
     ):
         self.lessons_repo = lessons_repo
         self.lesson_steps_repo = lesson_steps_repo
         self.lesson_step_result_repo = lesson_step_result_repo
         self.lesson_step_timing_repo = lesson_step_timing_repo
         self.lesson_step_text_repo = lesson_step_text_repo
+        self.uow = uow
+
+    def with_session(self, session: AsyncSession) -> "LessonsService":
+        """Сервис с такими же репозиториями на другой сессии"""
+        return LessonsService(
+            lessons_repo=LessonsRepository(session=session),
+            lesson_steps_repo=LessonsStepRepository(session=session),
+            lesson_step_result_repo=LessonsStepResultRepository(session=session),
+            lesson_step_timing_repo=LessonsStepTimingRepository(session=session),
+            lesson_step_text_repo=LessonStepTextRepository(session=session),
+            uow=UnitOfWork(session),
+        )
+
+    async def get_cached(
+        self,
+        key: str,
+        type_: Any,
+        load: Callable[["LessonsService"], Awaitable[T]],
+        tags: Sequence[str],
+        expire: int = settings.cache_expire,
+    ) -> T:
+        """Значение из кэша, устаревшее отдается и обновляется в фоне
+
+        load получает сервис: при фоновом обновлении - с новой сессией,
+        сессия запроса к этому времени уже закрыта.
+        """
+        return await cached_value(
+            key=key,
+            type_=type_,
+            load=lambda: load(self),
+            expire=expire,
+            tags=tags,
+            stale_ttl=settings.cache_stale_ttl,
+            refresh=lambda: self.run_in_new_session(load),
+        )
+
+    async def run_in_new_session(
+        self, fn: Callable[["LessonsService"], Awaitable[T]]
+    ) -> T:
+        """Выполнение fn с сервисом на новой сессии (для фоновых задач)"""
+        async with get_db_manager().session_factory() as session:
+            return await fn(self.with_session(session))
+
+    async def warm_up_cache(self) -> None:
+        """Заполнение кэша первой страницы каталога и статистики уроков"""
+        await self.get_lessons_page_with_user_results(
+            user_id=None, pagination=PaginationForm(limit=settings.page_size)
+        )
+        await self.get_all_lessons_with_steps_and_stats()
 
     async def create_lesson(self, new_lesson: CreateLessonSchema) -> LessonSchema:
         """Создание урока"""
-        created_lesson = await self.lessons_repo.add_one(new_entity=new_lesson)
+        async with self.uow:
+            created_lesson = await self.lessons_repo.add_one(new_entity=new_lesson)
 
         return created_lesson
 
@@ -54,12 +126,18 @@ class LessonsService:
     ) -> LessonStepSchema:
         """Создание этапа урока с текстами"""
         new_step_valid = CreateLessonStepSchema.model_validate(new_step.model_dump())
-        created_step = await self.lesson_steps_repo.add_one(new_entity=new_step_valid)
-        for text in new_step.texts:
-            new_text = CreateLessonStepTextSchema(
-                lesson_step_id=created_step.id, text=text
+        async with self.uow:
+            created_step = await self.lesson_steps_repo.add_one(
+                new_entity=new_step_valid
+            )
+            await self.lesson_step_text_repo.add_many(
+                [
+                    CreateLessonStepTextSchema(
+                        lesson_step_id=created_step.id, text=text
+                    )
+                    for text in new_step.texts or []
+                ]
             )
-            await self.lesson_step_text_repo.add_one(new_text)
         return created_step
 
     async def get_all_lessons_with_user_results(
@@ -70,28 +148,102 @@ class LessonsService:
 
         lessons = await self.lessons_repo.get_all_lessons()
         if user_id:
-            for lesson in lessons:
-                lesson.result = await self.collect_lesson_stats_by_user(
-                    lesson_id=lesson.id,
-                    user_id=user_id,
-                )
+            lessons_results = await self.get_user_lessons_results(user_id=user_id)
+            self.set_lessons_user_results(
+                lessons=lessons, lessons_results=lessons_results, user_id=user_id
+            )
 
         return lessons
 
+    async def get_lessons_page_with_user_results(
+        self, user_id: int | None, pagination: PaginationForm
+    ) -> PageSchema[LessonSchema]:
+        """Получение страницы уроков
+        (с результатами пользователя если он авторизован)
+
+        Страница кэшируется одна на всех, результаты - отдельно на пользователя.
+        """
+        page_key = hashlib.md5(pagination.model_dump_json().encode()).hexdigest()
+        page = await self.get_cached(
+            key=f"lessons:page:{page_key}",
+            type_=PageSchema[LessonSchema],
+            load=lambda service: service.get_lessons_page(pagination=pagination),
+            tags=["catalog"],
+        )
+        if user_id:
+            lessons_results = await self.get_user_lessons_results(user_id=user_id)
+            self.set_lessons_user_results(
+                lessons=page.items, lessons_results=lessons_results, user_id=user_id
+            )
+
+        return page
+
+    async def get_lessons_page(
+        self, pagination: PaginationForm
+    ) -> PageSchema[LessonSchema]:
+        """Получение страницы уроков без результатов пользователя"""
+        page = await self.lessons_repo.get_page(
+            limit=pagination.limit,
+            cursor=pagination.cursor,
+            order_by=pagination.order_by,
+        )
+        return PageSchema[LessonSchema].model_construct(
+            items=[construct_schema(LessonSchema, lesson) for lesson in page.items],
+            next_cursor=page.next_cursor,
+        )
+
+    async def get_user_lessons_results(
+        self, user_id: int
+    ) -> Dict[int, LessonResultSchema]:
+        """Сводные результаты пользователя по всем урокам (кэшируются)"""
+        return await self.get_cached(
+            key=f"lessons:results:{user_id}",
+            type_=Dict[int, LessonResultSchema],
+            load=lambda service: (
+                service.lesson_step_result_repo.get_lessons_results_by_user(
+                    user_id=user_id
+                )
+            ),
+            tags=[f"user:{user_id}", "catalog"],
+        )
+
+    @staticmethod
+    def set_lessons_user_results(
+        lessons: List[LessonSchema],
+        lessons_results: Dict[int, LessonResultSchema],
+        user_id: int,
+    ) -> None:
+        """Заполнение результатов пользователя для списка уроков"""
+        for lesson in lessons:
+            lesson.result = lessons_results.get(
+                lesson.id,
+                LessonResultSchema(lesson_id=lesson.id, user_id=user_id),
+            )
+
     async def get_all_lessons_with_steps_and_stats(self) -> List[LessonSchema]:
-        """Получение всех уроков с шагами и статистикой"""
-        lessons_id_list = [
-            lesson.id for lesson in await self.lessons_repo.get_all_lessons()
-        ]
-        lessons = []
-        for lesson_id in lessons_id_list:
-            lesson: LessonSchema = await self.get_one_lesson_with_steps(
-                lesson_id=lesson_id
+        """Получение всех уроков с шагами и статистикой (кэшируется)"""
+        return await self.get_cached(
+            key="lessons:stats",
+            type_=List[LessonSchema],
+            load=lambda service: service.collect_lessons_with_steps_and_stats(),
+            tags=["catalog"],
+            expire=settings.cache_stats_expire,
+        )
+
+    async def collect_lessons_with_steps_and_stats(self) -> List[LessonSchema]:
+        """Сбор всех уроков с шагами и статистикой"""
+        lessons = await self.lessons_repo.get_all_lessons_with_steps()
+        lessons_stats = await self.lessons_repo.get_lessons_stats()
+        steps_stats = await self.lesson_steps_repo.get_steps_stats()
+
+        for lesson in lessons:
+            lesson.stats = lessons_stats.get(
+                lesson.id, LessonStatsSchema(steps_count=0, users_count=0)
             )
-            lesson.stats = await self.get_lesson_stats(lesson_id=lesson.id)
             for step in lesson.steps:
-                step.stats = await self.get_lesson_step_stats(lesson_step_id=step.id)
-            lessons.append(lesson)
+                step.stats = steps_stats.get(
+                    step.id, LessonStepStatsSchema(users_count=0)
+                )
 
         return lessons
 
@@ -122,87 +274,82 @@ class LessonsService:
 
     async def get_lesson_stats(self, lesson_id: int) -> LessonStatsSchema:
         """Общая статистика по уроку"""
-        lesson: LessonSchema = await self.get_one_lesson_with_steps(lesson_id=lesson_id)
-        stats = LessonStatsSchema()
-        stats.steps_count = len(lesson.steps)
-        all_users = []
-        if lesson.steps:
-            for step in lesson.steps:
-                user_id_list = await self.lesson_step_result_repo.get_users_with_lesson_step_result(
-                    step_id=step.id
-                )
-                all_users.extend(user_id_list)
-        stats.users_count = len(set(all_users))
-
-        return stats
+        lessons_stats = await self.lessons_repo.get_lessons_stats(lesson_id=lesson_id)
+        return lessons_stats.get(
+            lesson_id, LessonStatsSchema(steps_count=0, users_count=0)
+        )
 
     async def get_lesson_step_stats(self, lesson_step_id: int) -> LessonStepStatsSchema:
         """Общая статистика по шагу урока"""
-
-        stats = LessonStepStatsSchema()
-        user_id_list = (
-            await self.lesson_step_result_repo.get_users_with_lesson_step_result(
-                step_id=lesson_step_id
-            )
+        steps_stats = await self.lesson_steps_repo.get_steps_stats(
+            step_id=lesson_step_id
         )
-        stats.users_count = len(set(user_id_list))
-
-        return stats
+        return steps_stats.get(lesson_step_id, LessonStepStatsSchema(users_count=0))
 
     async def get_one_lesson_with_steps(
         self, lesson_id: int, user_id: int | None = None
     ) -> LessonSchema:
-        """Получение урока с этапами и их результатми"""
-        lesson = await self.lessons_repo.get_one_lesson_with_steps(
-            user_id=user_id,
-            lesson_id=lesson_id,
+        """Получение урока с этапами и их результатми
+
+        Содержимое урока кэшируется одно на всех, прогресс - отдельно
+        на пользователя, и накладывается на содержимое при ответе.
+        """
+        lesson = await self.get_cached(
+            key=f"lesson:{lesson_id}:content",
+            type_=LessonSchema,
+            load=lambda service: service.lessons_repo.get_one_lesson_with_steps(
+                lesson_id=lesson_id, user_id=None
+            ),
+            tags=[f"lesson:{lesson_id}"],
         )
         if user_id:
-            lesson.result = await self.collect_lesson_stats_by_user(
-                user_id=user_id,
-                lesson_id=lesson_id,
+            progress = await self.get_cached(
+                key=f"lesson:{lesson_id}:progress:{user_id}",
+                type_=LessonProgressSchema,
+                load=lambda service: service.get_lesson_progress(
+                    lesson_id=lesson_id, user_id=user_id
+                ),
+                tags=[f"lesson:{lesson_id}", f"user:{user_id}"],
             )
+            lesson.result = progress.result
+            for step in lesson.steps or []:
+                step.result = progress.steps.get(step.id)
         return lesson
 
+    async def get_lesson_progress(
+        self, lesson_id: int, user_id: int
+    ) -> LessonProgressSchema:
+        """Прогресс пользователя по уроку: сводный результат и результаты шагов"""
+        result = await self.collect_lesson_stats_by_user(
+            user_id=user_id,
+            lesson_id=lesson_id,
+        )
+        results_repo = self.lesson_step_result_repo
+        step_results = await results_repo.get_results_by_user_ant_lesson_with_timings(
+            lesson_id=lesson_id,
+            user_id=user_id,
+        )
+        return LessonProgressSchema.model_construct(
+            result=result,
+            steps={
+                step_result.lesson_step_id: step_result for step_result in step_results
+            },
+        )
+
     async def collect_lesson_stats_by_user(
         self,
         user_id: int,
         lesson_id: int,
     ) -> LessonResultSchema:
         """Сбор статистики пользователя по уроку"""
-        step_results: List[LessonStepResultSchema] = (
-            await self.lesson_step_result_repo.get_results_by_user_ant_lesson_with_timings(
+        lessons_results = (
+            await self.lesson_step_result_repo.get_lessons_results_by_user(
                 user_id=user_id, lesson_id=lesson_id
             )
         )
-        lesson = await self.lessons_repo.get_one_lesson_with_steps(
-            lesson_id=lesson_id, user_id=user_id
+        return lessons_results.get(
+            lesson_id, LessonResultSchema(lesson_id=lesson_id, user_id=user_id)
         )
-        step_results_count = len(step_results) if lesson.steps else 0
-        steps_count = len(lesson.steps) if lesson.steps else 0
-        lesson_result = LessonResultSchema(lesson_id=lesson_id, user_id=user_id)
-
-        if step_results_count and steps_count:
-            lesson_result.percentage = int((step_results_count / steps_count) * 100)
-            lesson_result.average_wpm = int(
-                sum([int(result.wpm) if result.wpm else 0 for result in step_results])
-                / step_results_count
-            )
-            lesson_result.total_time_spent = sum(
-                [
-                    sum(result.timing_list)
-                    for result in step_results
-                    if result.timing_list
-                ]
-            )
-            lesson_result.total_time_best = sum(
-                [
-                    min(result.timing_list)
-                    for result in step_results
-                    if result.timing_list
-                ]
-            )
-        return lesson_result
 
     async def get_lesson_step_with_texts(
         self,
@@ -214,45 +361,35 @@ class LessonsService:
         )
         return result
 
+    def stream_lesson_step_results(
+        self, batch_size: int
+    ) -> AsyncIterator[List[LessonStepResultSchema]]:
+        """Потоковое получение всех результатов шагов уроков пачками"""
+        return self.lesson_step_result_repo.stream_all(batch_size=batch_size)
+
+    def stream_lesson_step_timings(
+        self, batch_size: int
+    ) -> AsyncIterator[List[LessonStepTimingSchema]]:
+        """Потоковое получение всех таймингов шагов уроков пачками"""
+        return self.lesson_step_timing_repo.stream_all(batch_size=batch_size)
+
     async def set_lesson_step_result(
         self, user_id: int, step_id: int, new_step_result: SetLessonStepResultForm
     ) -> int:
-        """Обновление или создание нового результата по уроку"""
+        """Обновление или создание нового результата по уроку
+        (вместе с временем прохождения, одним запросом)"""
 
-        exist_result = await self.lesson_step_result_repo.filter_by_field(
-            lesson_step_id=step_id, user_id=user_id
+        new_result = CreateLessonStepResultSchema.model_validate(
+            {
+                **new_step_result.model_dump(),
+                "user_id": user_id,
+                "lesson_step_id": step_id,
+            }
         )
-
-        if exist_result:
-            # обновляем существующий результат
-            updated_result = UpdateLessonStepResultSchema.model_validate(
-                {
-                    **new_step_result.model_dump(),
-                    "user_id": user_id,
-                    "lesson_step_id": step_id,
-                }
-            )
-            result = await self.lesson_step_result_repo.update_one(
-                id=exist_result[0].id, update_entity=updated_result
-            )
-
-        else:
-            # создаем новый результат
-            create_result = CreateLessonStepResultSchema.model_validate(
-                {
-                    **new_step_result.model_dump(),
-                    "user_id": user_id,
-                    "lesson_step_id": step_id,
-                }
-            )
-            result = await self.lesson_step_result_repo.add_one(
-                new_entity=create_result
-            )
-        # добавляем время к результату
-        if new_step_result.timing:
-            new_timing = CreateLessonStepTimingSchema(
-                seconds=new_step_result.timing, lesson_step_result_id=result.id
+        async with self.uow:
+            result_id = await self.lesson_step_result_repo.upsert_result_with_timing(
+                new_result=new_result,
+                timing=new_step_result.timing,
             )
-            await self.lesson_step_timing_repo.add_one(new_timing)
 
-        return result.id
+        return result_id
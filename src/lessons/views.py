@@ -1,14 +1,18 @@
 from typing import Annotated, List
 
 from fastapi import APIRouter, Depends, status
-from fastapi.responses import JSONResponse
-from fastapi_cache.decorator import cache
+from sqlalchemy.ext.asyncio import AsyncSession
 
 import src.lessons.dependencies as lessons_deps
 import src.users.dependencies as users_deps
+from src.core.cache import cache, invalidate_cache_tags
+from src.core.dependencies import get_pagination_dep, get_session
 from src.core.logger import logger
-from src.core.schemas import APIErrorMessage
-from src.database.base_schemas import DbEntityBaseSchema
+from src.core.responses import NDJSONResponse, PydanticJSONResponse
+from src.core.schemas import APIErrorMessage, PaginationForm
+from src.core.settings import settings
+from src.database.base_schemas import DbEntityBaseSchema, PageSchema
+from src.database.dto import construct_schema
 from src.lessons.schemas import (
     CreateLessonSchema,
     CreateLessonStepForm,
@@ -26,13 +30,12 @@ router = APIRouter(
 
 @router.get(
     "/",
-    response_model=List[LessonSchema],
+    response_model=PageSchema[LessonSchema],
     responses={
         400: {"model": APIErrorMessage},
         500: {"model": APIErrorMessage},
     },
 )
-@cache(expire=100)
 async def get_lessons_list(
     lesson_service: Annotated[
         LessonsService,
@@ -42,15 +45,17 @@ async def get_lessons_list(
         int,
         Depends(users_deps.get_current_user_id_dep),
     ],
-) -> JSONResponse:
-    """Получение списка уроков"""
+    pagination: Annotated[PaginationForm, Depends(get_pagination_dep)],
+) -> PydanticJSONResponse:
+    """Получение страницы списка уроков"""
     logger.debug("get_lessons_list user_id={user_id}")
-    lesson_list = await lesson_service.get_all_lessons_with_user_results(
-        user_id=user_id
+    lesson_page = await lesson_service.get_lessons_page_with_user_results(
+        user_id=user_id,
+        pagination=pagination,
     )
-    response_data = [lesson.model_dump() for lesson in lesson_list]
+    response_data = lesson_page
 
-    return JSONResponse(content=response_data, status_code=status.HTTP_200_OK)
+    return PydanticJSONResponse(content=response_data, status_code=status.HTTP_200_OK)
 
 
 @router.post(
@@ -67,13 +72,14 @@ async def create_lesson(
         Depends(lessons_deps.get_lesson_service_dep),
     ],
     new_lesson: CreateLessonSchema,
-) -> JSONResponse:
+) -> PydanticJSONResponse:
     """Создание урока"""
     logger.debug("create lesson")
     created_lesson = await lesson_service.create_lesson(new_lesson)
-    response_data = created_lesson.model_dump()
+    await invalidate_cache_tags("catalog")
+    response_data = created_lesson
 
-    return JSONResponse(content=response_data, status_code=status.HTTP_200_OK)
+    return PydanticJSONResponse(content=response_data, status_code=status.HTTP_200_OK)
 
 
 @router.get(
@@ -84,19 +90,68 @@ async def create_lesson(
         500: {"model": APIErrorMessage},
     },
 )
-@cache(expire=100)
 async def get_lessons_list_with_stats(
     lesson_service: Annotated[
         LessonsService,
         Depends(lessons_deps.get_lesson_service_dep),
     ],
-) -> JSONResponse:
+) -> PydanticJSONResponse:
     """Получение списка уроков c шагами и со статистикой"""
     logger.debug("get_lessons_list with stats}")
     lesson_list = await lesson_service.get_all_lessons_with_steps_and_stats()
-    response_data = [lesson.model_dump() for lesson in lesson_list]
+    response_data = lesson_list
+
+    return PydanticJSONResponse(content=response_data, status_code=status.HTTP_200_OK)
+
+
+@router.get(
+    "/results/export",
+    response_class=NDJSONResponse,
+    responses={
+        400: {"model": APIErrorMessage},
+        500: {"model": APIErrorMessage},
+    },
+    dependencies=[Depends(users_deps.is_current_user_admin_dep)],
+)
+async def export_lesson_step_results(
+    lesson_service: Annotated[
+        LessonsService,
+        Depends(lessons_deps.get_lesson_service_dep),
+    ],
+    session: Annotated[AsyncSession, Depends(get_session)],
+) -> NDJSONResponse:
+    """Выгрузка всех результатов шагов уроков в формате NDJSON"""
+    return NDJSONResponse(
+        lesson_service.stream_lesson_step_results(
+            batch_size=settings.stream_batch_size
+        ),
+        session=session,
+    )
 
-    return JSONResponse(content=response_data, status_code=status.HTTP_200_OK)
+
+@router.get(
+    "/timings/export",
+    response_class=NDJSONResponse,
+    responses={
+        400: {"model": APIErrorMessage},
+        500: {"model": APIErrorMessage},
+    },
+    dependencies=[Depends(users_deps.is_current_user_admin_dep)],
+)
+async def export_lesson_step_timings(
+    lesson_service: Annotated[
+        LessonsService,
+        Depends(lessons_deps.get_lesson_service_dep),
+    ],
+    session: Annotated[AsyncSession, Depends(get_session)],
+) -> NDJSONResponse:
+    """Выгрузка всех таймингов шагов уроков в формате NDJSON"""
+    return NDJSONResponse(
+        lesson_service.stream_lesson_step_timings(
+            batch_size=settings.stream_batch_size
+        ),
+        session=session,
+    )
 
 
 @router.get(
@@ -107,7 +162,6 @@ async def get_lessons_list_with_stats(
         500: {"model": APIErrorMessage},
     },
 )
-@cache(expire=100)
 async def get_lesson_by_id(
     lesson_service: Annotated[
         LessonsService,
@@ -118,15 +172,15 @@ async def get_lesson_by_id(
         Depends(users_deps.get_current_user_id_dep),
     ],
     id: int,
-) -> JSONResponse:
+) -> PydanticJSONResponse:
     """Получение урока по id"""
     logger.debug("get_lesson_by_id user_id={user_id}")
     lesson = await lesson_service.get_one_lesson_with_steps(
         user_id=user_id,
         lesson_id=id,
     )
-    response_data = LessonSchema.model_validate(lesson).model_dump()
-    return JSONResponse(content=response_data, status_code=status.HTTP_200_OK)
+    response_data = lesson
+    return PydanticJSONResponse(content=response_data, status_code=status.HTTP_200_OK)
 
 
 @router.get(
@@ -137,7 +191,7 @@ async def get_lesson_by_id(
         500: {"model": APIErrorMessage},
     },
 )
-@cache(expire=100)
+@cache(expire=settings.cache_expire, tags=["lesson:{id}"])
 async def get_lesson_step_by_id(
     lesson_service: Annotated[
         LessonsService,
@@ -145,16 +199,16 @@ async def get_lesson_step_by_id(
     ],
     id: int,
     step_id: int,
-) -> JSONResponse:
+) -> PydanticJSONResponse:
     """Получение этапа урока по id"""
     logger.debug(f"get_lesson_step_by_id lesson_id={id} step_id={step_id} ")
 
     step = await lesson_service.get_lesson_step_with_texts(
         step_id=step_id,
     )
-    response_data = LessonStepSchema.model_validate(step).model_dump()
+    response_data = step
 
-    return JSONResponse(content=response_data, status_code=status.HTTP_200_OK)
+    return PydanticJSONResponse(content=response_data, status_code=status.HTTP_200_OK)
 
 
 @router.post(
@@ -174,7 +228,7 @@ async def create_lesson_step(
     id: int,
     step_id: int,
     new_step: CreateLessonStepForm,
-) -> JSONResponse:
+) -> PydanticJSONResponse:
     """Создание этапа крока"""
     logger.debug(f"get_lesson_step_by_id lesson_id={id} step_id={step_id} ")
 
@@ -183,10 +237,11 @@ async def create_lesson_step(
     created_step = await lesson_service.create_lesson_step(
         new_step=CreateLessonStepForm.model_validate(new_step)
     )
+    await invalidate_cache_tags(f"lesson:{id}", "catalog")
 
-    response_data = LessonStepSchema.model_validate(created_step).model_dump()
+    response_data = construct_schema(LessonStepSchema, created_step)
 
-    return JSONResponse(content=response_data, status_code=status.HTTP_200_OK)
+    return PydanticJSONResponse(content=response_data, status_code=status.HTTP_200_OK)
 
 
 @router.post(
@@ -210,7 +265,7 @@ async def set_lesson_step_result(
     id: int,
     step_id: int,
     new_step_result: SetLessonStepResultForm,
-) -> JSONResponse:
+) -> PydanticJSONResponse:
     """Создание или обновление результа урока"""
     logger.debug(f"get_lesson_step_by_id lesson_id={id} step_id={step_id} ")
 
@@ -219,6 +274,7 @@ async def set_lesson_step_result(
         new_step_result=new_step_result,
         user_id=user_id,
     )
-    response_data = DbEntityBaseSchema.model_validate({"id": step_id}).model_dump()
+    await invalidate_cache_tags(f"user:{user_id}")
+    response_data = DbEntityBaseSchema(id=step_id)
 
-    return JSONResponse(content=response_data, status_code=status.HTTP_200_OK)
+    return PydanticJSONResponse(content=response_data, status_code=status.HTTP_200_OK)
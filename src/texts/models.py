@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import TYPE_CHECKING, List
 
-from sqlalchemy import ForeignKey, func
+from sqlalchemy import ForeignKey, Index, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from src.database.base_model import BaseSqlAlchemyModel
@@ -23,6 +23,7 @@ class TextConfigModel(BaseSqlAlchemyModel):
 
 class TextModel(BaseSqlAlchemyModel):
     __tablename__ = "texts"
+    __table_args__ = (Index("ix_texts_config_id", "config_id"),)
     text: Mapped[str] = mapped_column(nullable=True)
     description: Mapped[str] = mapped_column(nullable=True)
     config_id: Mapped[int] = mapped_column(ForeignKey("text_configs.id"))
@@ -37,6 +38,10 @@ class TextResultModel(BaseSqlAlchemyModel):
     """Результаты набора текста"""
 
     __tablename__ = "text_results"
+    __table_args__ = (
+        Index("ix_text_results_user_id", "user_id"),
+        Index("ix_text_results_text_id", "text_id"),
+    )
     percentage: Mapped[int] = mapped_column(nullable=True)
     wpm: Mapped[int] = mapped_column(nullable=True)
     status: Mapped[str] = mapped_column(
@@ -44,7 +49,8 @@ class TextResultModel(BaseSqlAlchemyModel):
     )  # success" | "fail" | "notchecked"
 
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
-    user: Mapped["UserModel"] = relationship(back_populates="text_results")
+    # у UserModel нет обратной связи, модели текстов приложением не загружаются
+    user: Mapped["UserModel"] = relationship()
 
     text_id: Mapped[int] = mapped_column(ForeignKey("texts.id"))
     text: Mapped["TextModel"] = relationship(back_populates="results")
@@ -61,6 +67,7 @@ class TextTimingModel(BaseSqlAlchemyModel):
     """Временные результаты прохождения этапа урока"""
 
     __tablename__ = "text_timings"
+    __table_args__ = (Index("ix_text_timings_text_result_id", "text_result_id"),)
     seconds: Mapped[int] = mapped_column(nullable=True)
     created_date: Mapped[datetime] = mapped_column(server_default=func.now())
 
@@ -0,0 +1,118 @@
+"""Кэш авторизации в памяти процесса: проверенные токены и пользователи"""
+
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Generic, Hashable, Tuple, TypeVar
+
+from src.core.local_cache import CACHE_REQUESTS
+from src.core.settings import settings
+from src.users.schemas import UserAuthSchema
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class ExpiringCache(Generic[K, V]):
+    """LRU кэш, ограниченный количеством записей, со сроком жизни у каждой записи"""
+
+    def __init__(self, name: str, max_entries: int):
+        self.name = name  # уровень в метрике cache_requests_total
+        self.max_entries = max_entries
+        self._entries: OrderedDict[K, Tuple[float, V]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: K) -> V | None:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            CACHE_REQUESTS.labels(tier=self.name, result="miss").inc()
+            return None
+
+        self._entries.move_to_end(key)
+        CACHE_REQUESTS.labels(tier=self.name, result="hit").inc()
+        return entry[1]
+
+    def set(self, key: K, value: V, ttl: float) -> None:
+        """Сохранение записи на ttl сек"""
+        self._entries.pop(key, None)
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+
+        self._entries[key] = (time.monotonic() + ttl, value)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def delete(self, *keys: K) -> None:
+        for key in keys:
+            self._entries.pop(key, None)
+
+    def items(self) -> list[Tuple[K, V]]:
+        return [(key, value) for key, (_, value) in self._entries.items()]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+@dataclass(frozen=True)
+class VerifiedToken:
+    user_id: int
+    expire: int  # exp токена, unix time
+
+
+class AuthCache:
+    """Проверенные токены (до их exp) и пользователи (короткий TTL)
+
+    Токен хранится по sha256, сам токен в памяти не остается. Удаление
+    пользователя сбрасывает кэш только в своем процессе, остальные
+    процессы видят его не дольше user_ttl.
+    """
+
+    def __init__(self, max_tokens: int, max_users: int, user_ttl: float):
+        self.user_ttl = user_ttl
+        self.tokens: ExpiringCache[str, VerifiedToken] = ExpiringCache(
+            "auth_token", max_tokens
+        )
+        self.users: ExpiringCache[int, UserAuthSchema] = ExpiringCache(
+            "auth_user", max_users
+        )
+
+    @staticmethod
+    def get_token_key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get_token(self, token: str) -> VerifiedToken | None:
+        return self.tokens.get(self.get_token_key(token))
+
+    def set_token(self, token: str, verified: VerifiedToken) -> None:
+        self.tokens.set(
+            self.get_token_key(token), verified, ttl=verified.expire - time.time()
+        )
+
+    def get_user(self, user_id: int) -> UserAuthSchema | None:
+        return self.users.get(user_id)
+
+    def set_user(self, user: UserAuthSchema) -> None:
+        self.users.set(user.id, user, ttl=self.user_ttl)
+
+    def invalidate_user(self, user_id: int) -> None:
+        """Сброс пользователя и всех его токенов"""
+        self.users.delete(user_id)
+        self.tokens.delete(
+            *(key for key, token in self.tokens.items() if token.user_id == user_id)
+        )
+
+    def clear(self) -> None:
+        self.tokens.clear()
+        self.users.clear()
+
+
+auth_cache = AuthCache(
+    max_tokens=settings.auth_token_cache_max_entries,
+    max_users=settings.auth_user_cache_max_entries,
+    user_ttl=settings.auth_user_cache_ttl,
+)
@@ -4,8 +4,10 @@ from fastapi import Depends, HTTPException, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.core.dependencies import get_session
+from src.database.unit_of_work import UnitOfWork
 from src.users.errors import AuthError
 from src.users.repository import UsersRepository
+from src.users.schemas import AuthContext
 from src.users.service import AuthService, UsersService
 
 
@@ -17,6 +19,7 @@ async def get_auth_service_dep(
 
     service = AuthService(
         user_repo=users_repo,
+        uow=UnitOfWork(session),
     )
     return service
 
@@ -29,6 +32,7 @@ async def get_users_service_dep(
 
     service = UsersService(
         user_repo=users_repo,
+        uow=UnitOfWork(session),
     )
     return service
 
@@ -51,75 +55,61 @@ def get_token_or_none_dep(request: Request) -> str | None:
     return token
 
 
-async def is_auth_dep(
+async def get_auth_context_dep(
+    token: Annotated[str | None, Depends(get_token_or_none_dep)],
     auth_service: Annotated[AuthService, Depends(get_auth_service_dep)],
     users_service: Annotated[UsersService, Depends(get_users_service_dep)],
-    token: Annotated[str, Depends(get_token_dep)],
-) -> bool:
-    """Проверка авторизации пользователя"""
+) -> AuthContext:
+    """Авторизация запроса по заголовку Authorization
 
+    Зависимости кэшируются FastAPI в рамках запроса, поэтому токен
+    проверяется и пользователь ищется один раз, сколько бы проверок
+    ни использовал роут.
+    """
+    if not token:
+        return AuthContext(error="Token not found")
     try:
-        user_id = auth_service.check_access_token(token=token)
-
+        verified = auth_service.verify_access_token(token=token)
     except AuthError as e:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=e)
+        return AuthContext(error=str(e))
 
-    user = await users_service.get_user_by_id(user_id)
+    user = await users_service.get_user_auth_info(verified.user_id)
     if not user:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found"
-        )
-
-    return True  # type: ignore
+        return AuthContext(error="User not found")
 
-
-async def get_current_user_id_dep(
-    token: Annotated[str, Depends(get_token_or_none_dep)],
-    auth_service: Annotated[AuthService, Depends(get_auth_service_dep)],
-) -> int | None:
-    """Получение id пользователя"""
-    if not token:
-        return None
-    try:
-        user_id = auth_service.check_access_token(token=token)
-        return user_id
-    except AuthError:
-        return None
+    return AuthContext(user_id=user.id, is_admin=user.is_admin, expire=verified.expire)
 
 
-async def get_current_user_dep(
-    token: Annotated[str, Depends(get_token_or_none_dep)],
-    auth_service: Annotated[AuthService, Depends(get_auth_service_dep)],
-) -> int | None:
-    """Получение id пользователя"""
-    if not token:
-        return None
-    try:
-        user_id = auth_service.check_access_token(token=token)
-        return user_id
-    except AuthError:
-        return None
+async def is_auth_dep(
+    auth: Annotated[AuthContext, Depends(get_auth_context_dep)],
+) -> bool:
+    """Проверка авторизации пользователя"""
+    if not auth.is_authenticated:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=auth.error)
+    return True
 
 
 async def is_current_user_admin_dep(
-    session: Annotated[AsyncSession, Depends(get_session)],
-    token: Annotated[str, Depends(get_token_dep)],
-    is_auth_dep: Annotated[str, Depends(is_auth_dep)],
+    auth: Annotated[AuthContext, Depends(get_auth_context_dep)],
+    is_auth: Annotated[bool, Depends(is_auth_dep)],
 ) -> bool:
-    """Проверка авторизации пользователя"""
-    user_repo = UsersRepository(session=session)
-    auth_service = AuthService(user_repo=user_repo)
+    """Проверка, что пользователь авторизован и является администратором"""
+    if not auth.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Admin rights required"
+        )
+    return True
 
-    try:
-        user_id = auth_service.check_access_token(token=token)
 
-    except AuthError as e:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=e)
+async def get_current_user_id_dep(
+    auth: Annotated[AuthContext, Depends(get_auth_context_dep)],
+) -> int | None:
+    """Получение id пользователя, None - не авторизован"""
+    return auth.user_id
 
-    user = await user_repo.get_one(user_id)
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found"
-        )
 
-    return True  # type: ignore
+async def get_current_user_dep(
+    auth: Annotated[AuthContext, Depends(get_auth_context_dep)],
+) -> int | None:
+    """Получение id пользователя, None - не авторизован"""
+    return auth.user_id
@@ -0,0 +1,68 @@
+"""Хэширование паролей (bcrypt) вне event loop"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, TypeVar
+
+from passlib.context import CryptContext
+from prometheus_client import Histogram
+
+from src.core.settings import settings
+
+T = TypeVar("T")
+
+PASSWORD_HASH_QUEUE_TIME = Histogram(
+    "password_hash_queue_seconds",
+    "Ожидание свободного потока для bcrypt",
+    ["operation"],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+PASSWORD_HASH_TIME = Histogram(
+    "password_hash_duration_seconds",
+    "Время вычисления bcrypt",
+    ["operation"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1),
+)
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+class PasswordHasher:
+    """bcrypt в отдельном пуле потоков с ограничением параллельности
+
+    bcrypt отпускает GIL, поэтому хэши считаются в потоках параллельно
+    и не останавливают event loop. Лишние вызовы ждут в очереди пула.
+    """
+
+    def __init__(self, max_workers: int):
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="password-hash"
+        )
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", lambda: pwd_context.hash(password))
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._run(
+            "verify", lambda: pwd_context.verify(password, hashed_password)
+        )
+
+    async def _run(self, operation: str, fn: Callable[[], T]) -> T:
+        queued_at = time.perf_counter()
+
+        def timed() -> T:
+            started_at = time.perf_counter()
+            PASSWORD_HASH_QUEUE_TIME.labels(operation).observe(started_at - queued_at)
+            try:
+                return fn()
+            finally:
+                PASSWORD_HASH_TIME.labels(operation).observe(
+                    time.perf_counter() - started_at
+                )
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, timed)
+
+
+password_hasher = PasswordHasher(max_workers=settings.password_hash_workers)
@@ -1,6 +1,14 @@
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
 from src.database.base_repository import BaseSqlAlchemyRepository
 from src.users.models import UserModel
-from src.users.schemas import CreateUserSchema, UpdateUserSchema, UserSchema
+from src.users.schemas import (
+    CreateUserSchema,
+    UpdateUserSchema,
+    UserAuthSchema,
+    UserSchema,
+)
 
 
 class UsersRepository(BaseSqlAlchemyRepository):
@@ -8,3 +16,26 @@ class UsersRepository(BaseSqlAlchemyRepository):
     entity_schema = UserSchema
     create_schema = CreateUserSchema
     update_schema = UpdateUserSchema
+
+    async def add_if_username_free(self, new_user: CreateUserSchema) -> int | None:
+        """Создание пользователя одним запросом
+
+        INSERT ... ON CONFLICT DO NOTHING по уникальному username.
+        Возвращает id нового пользователя или None, если имя занято.
+        """
+        stmt = (
+            pg_insert(self.model)
+            .values(**new_user.model_dump())
+            .on_conflict_do_nothing(index_elements=[self.model.username])
+            .returning(self.model.id)
+        )
+        query_result = await self.session.execute(stmt)
+        return query_result.scalar_one_or_none()
+
+    async def get_auth_info(self, id: int) -> UserAuthSchema | None:
+        """id и is_admin пользователя для проверки прав, None - не найден"""
+        stmt = select(self.model.id, self.model.is_admin).where(self.model.id == id)
+        row = (await self.session.execute(stmt)).one_or_none()
+        if row is None:
+            return None
+        return UserAuthSchema(id=row.id, is_admin=bool(row.is_admin))
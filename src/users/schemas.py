@@ -10,6 +10,25 @@ class UserSchema(DbEntityBaseSchema):
     model_config = ConfigDict(from_attributes=True)
 
 
+class UserAuthSchema(BaseModel):
+    id: int
+    is_admin: bool = False
+    model_config = ConfigDict(from_attributes=True)
+
+
+class AuthContext(BaseModel):
+    """Авторизация текущего запроса, user_id None - не авторизован"""
+
+    user_id: int | None = None
+    is_admin: bool = False
+    expire: int | None = None  # exp токена, unix time
+    error: str | None = None  # причина, по которой запрос не авторизован
+
+    @property
+    def is_authenticated(self) -> bool:
+        return self.user_id is not None
+
+
 class UserLessonsStats(BaseModel):
     completed_lessons_count: int | None = None
     lessons_count: int | None = None
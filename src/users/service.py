@@ -1,16 +1,21 @@
 import os
 from datetime import datetime, timedelta, timezone
-from typing import List
+from typing import AsyncIterator, List
 
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 
+from src.core.schemas import PaginationForm
+from src.database.base_schemas import PageSchema
+from src.database.unit_of_work import UnitOfWork
+from src.users.auth_cache import VerifiedToken, auth_cache
 from src.users.errors import AuthError
+from src.users.passwords import password_hasher
 from src.users.repository import UsersRepository
 from src.users.schemas import (
     AuthRequestSchema,
     CreateUserSchema,
     SuccessAuthResponseSchema,
+    UserAuthSchema,
     UserSchema,
 )
 
@@ -19,13 +24,16 @@ class AuthService:
     def __init__(
         self,
         user_repo: UsersRepository,
+        uow: UnitOfWork,
     ) -> None:
         """Init AuthService
 
         Args:
             user_repo (UsersRepository): для получения данных users из БД
+            uow (UnitOfWork): для фиксации изменений в БД
         """
         self.user_repo = user_repo
+        self.uow = uow
 
     @staticmethod
     def get_auth_config() -> dict[str, str]:
@@ -56,19 +64,28 @@ class AuthService:
         return encode_jwt
 
     @staticmethod
-    def get_password_hash(password: str) -> str:
-        """Создание хэша"""
-        pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-        return pwd_context.hash(password)
+    async def get_password_hash(password: str) -> str:
+        """Создание хэша (в пуле потоков, не блокируя event loop)"""
+        return await password_hasher.hash(password)
 
     @staticmethod
-    def verify_password(plain_password: str, hashed_password: str) -> bool:
-        """Проверка валидности пароля"""
-        pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-        return pwd_context.verify(plain_password, hashed_password)
+    async def verify_password(plain_password: str, hashed_password: str) -> bool:
+        """Проверка валидности пароля (в пуле потоков, не блокируя event loop)"""
+        return await password_hasher.verify(plain_password, hashed_password)
 
     def check_access_token(self, token: str) -> int:
         """Проверяет токен, возвращает id пользователя"""
+        return self.verify_access_token(token).user_id
+
+    def verify_access_token(self, token: str) -> VerifiedToken:
+        """Проверяет токен, возвращает id пользователя и exp токена
+
+        Проверенный токен кэшируется в процессе до своего exp.
+        """
+        verified = auth_cache.get_token(token)
+        if verified is not None:
+            return verified
+
         try:
             auth_data = AuthService.get_auth_config()
             payload = jwt.decode(
@@ -89,7 +106,9 @@ class AuthService:
         if not user_id:
             raise AuthError("Не найден ID пользователя")
 
-        return int(user_id)
+        verified = VerifiedToken(user_id=int(user_id), expire=int(expire))
+        auth_cache.set_token(token, verified)
+        return verified
 
     async def auth_user(self, creds: AuthRequestSchema) -> SuccessAuthResponseSchema:
         """Авторизация пользователя"""
@@ -99,7 +118,7 @@ class AuthService:
             raise AuthError("User with this username not found!")
         else:
             user = users[0]
-        if not self.verify_password(
+        if not await self.verify_password(
             plain_password=creds.password,
             hashed_password=user.password,  # type: ignore
         ):
@@ -114,46 +133,71 @@ class AuthService:
     async def register_user(
         self, input_dto: CreateUserSchema
     ) -> SuccessAuthResponseSchema:
-        """Регистрация пользователя"""
-        exist_user = await self.user_repo.filter_by_field(username=input_dto.username)
-        if exist_user:
-            raise AuthError("User with this username already exist!")
+        """Регистрация пользователя
 
-        new_user = await self.user_repo.add_one(
-            CreateUserSchema(
-                username=input_dto.username,
-                password=self.get_password_hash(input_dto.password),
-            )
-        )
-        auth_data = await self.auth_user(
-            AuthRequestSchema(
-                username=new_user.username,  # type: ignore
-                password=input_dto.password,
+        Занятость имени проверяет уникальный индекс users.username,
+        токен выдается сразу, без повторного поиска и проверки пароля.
+        """
+        password_hash = await self.get_password_hash(input_dto.password)
+        async with self.uow:
+            user_id = await self.user_repo.add_if_username_free(
+                CreateUserSchema(username=input_dto.username, password=password_hash)
             )
-        )
-        return auth_data
+        if user_id is None:
+            raise AuthError("User with this username already exist!")
+
+        access_token = self.create_access_token({"sub": str(user_id)})
+        return SuccessAuthResponseSchema(token=access_token)
 
 
 class UsersService:
     def __init__(
         self,
         user_repo: UsersRepository,
+        uow: UnitOfWork,
     ) -> None:
         """Init UsersService
 
         Args:
             user_repo (UsersRepository): для получения данных users из БД
+            uow (UnitOfWork): для фиксации изменений в БД
         """
         self.user_repo = user_repo
+        self.uow = uow
 
     async def get_users_list(self) -> List[UserSchema]:
         result = await self.user_repo.get_all()
         return result
 
+    async def get_users_page(
+        self, pagination: PaginationForm
+    ) -> PageSchema[UserSchema]:
+        result = await self.user_repo.get_page(
+            limit=pagination.limit,
+            cursor=pagination.cursor,
+            order_by=pagination.order_by,
+        )
+        return result
+
+    def stream_users(self, batch_size: int) -> AsyncIterator[List[UserSchema]]:
+        """Потоковое получение всех пользователей пачками"""
+        return self.user_repo.stream_all(batch_size=batch_size)
+
     async def get_user_by_id(self, id: int) -> UserSchema:
         result = await self.user_repo.get_one(id=id)
         return result
 
+    async def get_user_auth_info(self, id: int) -> UserAuthSchema | None:
+        """id и is_admin пользователя (кэш в процессе), None - не найден"""
+        user = auth_cache.get_user(id)
+        if user is None:
+            user = await self.user_repo.get_auth_info(id=id)
+            if user is not None:
+                auth_cache.set_user(user)
+        return user
+
     async def delete_user_by_id(self, id: int) -> int:
-        result = await self.user_repo.delete_one(id=id)
+        async with self.uow:
+            result = await self.user_repo.delete_one(id=id)
+        auth_cache.invalidate_user(id)
         return result
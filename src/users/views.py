@@ -1,12 +1,17 @@
-from typing import Annotated, List
+from typing import Annotated
 
 from fastapi import APIRouter, Depends, status
-from fastapi.responses import JSONResponse
-from fastapi_cache.decorator import cache
+from sqlalchemy.ext.asyncio import AsyncSession
 
 import src.lessons.dependencies as lessons_deps
 import src.users.dependencies as users_deps
-from src.core.schemas import APIErrorMessage
+from src.core.cache import cache, invalidate_cache_tags
+from src.core.dependencies import get_pagination_dep, get_session
+from src.core.responses import NDJSONResponse, PydanticJSONResponse
+from src.core.schemas import APIErrorMessage, PaginationForm
+from src.core.settings import settings
+from src.database.base_schemas import PageSchema
+from src.database.dto import construct_schema
 from src.lessons.service import LessonsService
 from src.users.schemas import (
     AuthRequestSchema,
@@ -34,9 +39,9 @@ auth_router = APIRouter(
         400: {"model": APIErrorMessage},
         500: {"model": APIErrorMessage},
     },
-    dependencies=[Depends(users_deps.get_token_dep)],
+    dependencies=[Depends(users_deps.is_auth_dep)],
 )
-@cache(expire=100)
+@cache(expire=settings.cache_expire, tags=["user:{user_id}", "catalog"])
 async def get_user_profile(
     users_service: Annotated[
         UsersService,
@@ -49,44 +54,65 @@ async def get_user_profile(
         int,
         Depends(users_deps.get_current_user_id_dep),
     ],
-) -> JSONResponse:
+) -> PydanticJSONResponse:
     """Получение профиля авторизованного пользователя"""
 
     user = await users_service.get_user_by_id(id=user_id)
 
     stats = await lessons_service.get_user_lessons_stats(user_id=user_id)
-    response_data = UserProfileSchema.model_validate(
-        {
-            **user.__dict__,
-            "lessons_stats": stats.model_dump(),
-        }
-    ).model_dump()
+    response_data = construct_schema(UserProfileSchema, user, lessons_stats=stats)
 
-    return JSONResponse(content=response_data, status_code=status.HTTP_200_OK)
+    return PydanticJSONResponse(content=response_data, status_code=status.HTTP_200_OK)
 
 
 @users_router.get(
     "/",
-    response_model=List[UserProfileSchema],
+    response_model=PageSchema[UserProfileSchema],
     responses={
         400: {"model": APIErrorMessage},
         500: {"model": APIErrorMessage},
     },
 )
-@cache(expire=100)
+@cache(expire=settings.cache_expire, tags=["users"])
 async def get_users_list(
     users_service: Annotated[
         UsersService,
         Depends(users_deps.get_users_service_dep),
     ],
-) -> JSONResponse:
-    """Получение списка пользователей"""
-    user_list = await users_service.get_users_list()
-    response_data = [
-        UserProfileSchema.model_validate(user).model_dump() for user in user_list
-    ]
+    pagination: Annotated[PaginationForm, Depends(get_pagination_dep)],
+) -> PydanticJSONResponse:
+    """Получение страницы списка пользователей"""
+    user_page = await users_service.get_users_page(pagination=pagination)
+    response_data = PageSchema[UserProfileSchema].model_construct(
+        items=[construct_schema(UserProfileSchema, user) for user in user_page.items],
+        next_cursor=user_page.next_cursor,
+    )
 
-    return JSONResponse(content=response_data, status_code=status.HTTP_200_OK)
+    return PydanticJSONResponse(content=response_data, status_code=status.HTTP_200_OK)
+
+
+@users_router.get(
+    "/export",
+    response_class=NDJSONResponse,
+    responses={
+        400: {"model": APIErrorMessage},
+        500: {"model": APIErrorMessage},
+    },
+    dependencies=[Depends(users_deps.is_current_user_admin_dep)],
+)
+async def export_users(
+    users_service: Annotated[
+        UsersService,
+        Depends(users_deps.get_users_service_dep),
+    ],
+    session: Annotated[AsyncSession, Depends(get_session)],
+) -> NDJSONResponse:
+    """Выгрузка всех пользователей в формате NDJSON"""
+    return NDJSONResponse(
+        users_service.stream_users(batch_size=settings.stream_batch_size),
+        session=session,
+        schema=UserProfileSchema,
+    )
 
 
 @users_router.get(
@@ -97,19 +123,19 @@ async def get_users_list(
         500: {"model": APIErrorMessage},
     },
 )
-@cache(expire=100)
+@cache(expire=settings.cache_expire, tags=["user:{id}"])
 async def get_user_by_id(
     users_service: Annotated[
         UsersService,
         Depends(users_deps.get_users_service_dep),
     ],
     id: int,
-) -> JSONResponse:
+) -> PydanticJSONResponse:
     """Получение пользователя по id"""
     user = await users_service.get_user_by_id(id=id)
-    response_data = UserProfileSchema.model_validate(user).model_dump()
+    response_data = construct_schema(UserProfileSchema, user)
 
-    return JSONResponse(content=response_data, status_code=status.HTTP_200_OK)
+    return PydanticJSONResponse(content=response_data, status_code=status.HTTP_200_OK)
 
 
 @users_router.delete(
@@ -126,12 +152,13 @@ async def delete_user_by_id(
         Depends(users_deps.get_users_service_dep),
     ],
     id: int,
-) -> JSONResponse:
+) -> PydanticJSONResponse:
     """Удаление пользователя по id"""
     deleted_user_id = await users_service.delete_user_by_id(id=id)
+    await invalidate_cache_tags(f"user:{id}", "users")
     response_data = {"deleted": deleted_user_id}
 
-    return JSONResponse(content=response_data, status_code=status.HTTP_200_OK)
+    return PydanticJSONResponse(content=response_data, status_code=status.HTTP_200_OK)
 
 
 @auth_router.post(
@@ -148,11 +175,12 @@ async def registration(
         AuthService,
         Depends(users_deps.get_auth_service_dep),
     ],
-) -> JSONResponse:
+) -> PydanticJSONResponse:
     """Регистрация пользователя"""
     token = await auth_service.register_user(request)
+    await invalidate_cache_tags("users")
 
-    return JSONResponse(content=token.model_dump(), status_code=status.HTTP_200_OK)
+    return PydanticJSONResponse(content=token, status_code=status.HTTP_200_OK)
 
 
 @auth_router.post(
@@ -169,9 +197,9 @@ async def login(
         AuthService,
         Depends(users_deps.get_auth_service_dep),
     ],
-) -> JSONResponse:
+) -> PydanticJSONResponse:
     """Авторизация пользователя"""
 
     token = await auth_service.auth_user(request)
 
-    return JSONResponse(content=token.model_dump(), status_code=status.HTTP_200_OK)
+    return PydanticJSONResponse(content=token, status_code=status.HTTP_200_OK)
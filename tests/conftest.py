@@ -1,15 +1,21 @@
+from contextlib import contextmanager
 from functools import wraps
+from typing import AsyncIterator, Callable, ContextManager, Iterator, List
 from unittest import mock
 
 import pytest
 import pytest_asyncio
 from fastapi.testclient import TestClient
+from fastapi_cache import decorator as cache_decorator
 from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
 
 from src.core.dependencies import get_session
 from src.core.logger import logger
 from src.database.base_model import BaseSqlAlchemyModel
 from src.database.db_manager import AsyncPostgresDatabaseManager
+from src.database.query_counter import count_queries
 
 
 def mock_cache(*args, **kwargs):
@@ -23,6 +29,9 @@ def mock_cache(*args, **kwargs):
     return wrapper
 
 
+# настоящий декоратор для тестов кэша
+real_cache = cache_decorator.cache
+
 mock.patch("fastapi_cache.decorator.cache", mock_cache).start()
 
 
@@ -43,6 +52,26 @@ def test_client() -> TestClient:
     return TestClient(api)
 
 
+@pytest.fixture()
+def query_budget() -> Callable[[int], ContextManager[List[str]]]:
+    """Проверка, что внутри блока выполнено не больше max_queries SQL запросов
+
+    with query_budget(3):
+        test_client.get("/lessons/")
+    """
+
+    @contextmanager
+    def check_budget(max_queries: int) -> Iterator[List[str]]:
+        with count_queries() as statements:
+            yield statements
+        queries = "\n".join(statements)
+        assert (
+            len(statements) <= max_queries
+        ), f"{len(statements)} SQL запросов при бюджете {max_queries}:\n{queries}"
+
+    return check_budget
+
+
 # def run_migrations(connection) -> None:
 #     logger.debug(f"Running DB migrations in {TEST_DB_URL}")
 #     alembic_cfg = Config()
@@ -103,3 +132,25 @@ async def fake_db_create():
     # async with engine.begin() as conn:
     #     await conn.run_sync(BaseSqlAlchemyModel.metadata.drop_all)
     #     await engine.dispose()
+
+
+@pytest_asyncio.fixture()
+async def db_session(fake_db_create) -> AsyncIterator[AsyncSession]:
+    """Сессия тестовой бд, все изменения откатываются после теста
+
+    commit внутри теста (UnitOfWork) фиксирует только savepoint.
+    """
+    engine = create_async_engine(TEST_DB_URL, poolclass=NullPool)
+    async with engine.connect() as conn:
+        await conn.begin()
+        session = AsyncSession(
+            bind=conn,
+            join_transaction_mode="create_savepoint",
+            expire_on_commit=False,
+        )
+        try:
+            yield session
+        finally:
+            await session.close()
+            await conn.rollback()
+    await engine.dispose()
@@ -0,0 +1,358 @@
+import asyncio
+import contextlib
+import uuid
+from typing import (
+    Annotated,
+    AsyncIterator,
+    Awaitable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+
+import pytest
+import pytest_asyncio
+from fastapi import Depends, FastAPI, Header
+from fastapi.testclient import TestClient
+from fastapi_cache import FastAPICache
+from fastapi_cache.types import Backend
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+
+from src.core.cache import (
+    JSONBytesCoder,
+    TaggedRedisBackend,
+    TwoTierRedisBackend,
+    _refresh_tasks,
+    cache,
+    cache_key_builder,
+    cached_value,
+)
+from src.core.local_cache import LocalCache
+from src.core.responses import PydanticJSONResponse
+from src.core.settings import redis_settings
+from src.lessons.schemas import LessonResultSchema
+from tests.conftest import real_cache
+
+
+class ItemsService:
+    """Зависимость, создаваемая на каждый запрос, как сервисы с сессией бд"""
+
+
+def get_user_id(x_user_id: Annotated[int | None, Header()] = None) -> int | None:
+    return x_user_id
+
+
+class MemoryBackend(Backend):
+    """Бэкенд кэша в памяти с управляемыми часами вместо redis"""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.store: Dict[str, Tuple[float, bytes]] = {}
+
+    async def get_with_ttl(self, key: str) -> Tuple[int, Optional[bytes]]:
+        expires_at, value = self.store.get(key, (0.0, b""))
+        if expires_at <= self.now:
+            return 0, None
+        return int(expires_at - self.now), value
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return (await self.get_with_ttl(key))[1]
+
+    async def set(self, key: str, value: bytes, expire: Optional[int] = None) -> None:
+        self.store[key] = (self.now + (expire or 10**9), value)
+
+    async def clear(
+        self, namespace: Optional[str] = None, key: Optional[str] = None
+    ) -> int:
+        count = len(self.store)
+        self.store.clear()
+        return count
+
+
+@pytest.fixture()
+def cache_backend(mocker) -> Iterator[MemoryBackend]:  # type: ignore
+    """Настоящий декоратор кэша с бэкендом в памяти вместо redis"""
+    mocker.patch("fastapi_cache.decorator.cache", real_cache)
+    backend = MemoryBackend()
+    FastAPICache.reset()
+    FastAPICache.init(
+        backend, prefix="test", coder=JSONBytesCoder, key_builder=cache_key_builder
+    )
+    yield backend
+    FastAPICache.reset()
+
+
+@pytest_asyncio.fixture()
+async def redis_backend() -> AsyncIterator[TaggedRedisBackend]:
+    """Бэкенд на redis из настроек (docker compose), иначе на fakeredis
+
+    Ключи теста - под своим префиксом, после теста удаляются.
+    """
+    redis = aioredis.from_url(
+        f"redis://{redis_settings.address}:{redis_settings.port}",
+        socket_connect_timeout=1,
+    )
+    try:
+        await redis.ping()
+    except (RedisError, OSError):
+        await redis.close()
+        fakeredis = pytest.importorskip("fakeredis")
+        redis = fakeredis.FakeAsyncRedis()
+
+    prefix = f"test-{uuid.uuid4().hex}"
+    backend = TaggedRedisBackend(redis)
+    FastAPICache.reset()
+    FastAPICache.init(backend, prefix=prefix, coder=JSONBytesCoder)
+    yield backend
+    FastAPICache.reset()
+    keys = [key async for key in redis.scan_iter(f"{prefix}:*")]
+    if keys:
+        await redis.delete(*keys)
+    await redis.close()
+
+
+def test_repeated_requests_hit_cache(cache_backend: MemoryBackend) -> None:
+
+    calls: List[Tuple[int, int | None]] = []
+    app = FastAPI()
+
+    @app.get("/items/{id}")
+    @cache(expire=60)
+    async def get_item(
+        service: Annotated[ItemsService, Depends(ItemsService)],
+        user_id: Annotated[int | None, Depends(get_user_id)],
+        id: int,
+        q: str = "",
+    ) -> PydanticJSONResponse:
+        calls.append((id, user_id))
+        return PydanticJSONResponse(content={"id": id, "user_id": user_id, "q": q})
+
+    client = TestClient(app)
+    first = client.get("/items/1", headers={"X-User-Id": "1"})
+    second = client.get("/items/1", headers={"X-User-Id": "1"})
+
+    assert second.status_code == 200
+    assert second.content == first.content
+    assert calls == [(1, 1)]
+
+    client.get("/items/1", headers={"X-User-Id": "2"})
+    client.get("/items/1?q=a", headers={"X-User-Id": "1"})
+    client.get("/items/2", headers={"X-User-Id": "1"})
+
+    assert calls == [(1, 1), (1, 2), (1, 1), (2, 1)]
+    assert len(cache_backend.store) == 4
+    assert all(":GET:/items/{id}:" in key for key in cache_backend.store)
+
+
+@pytest.mark.asyncio
+async def test_cached_value_loads_once(cache_backend: MemoryBackend) -> None:
+
+    calls: List[int] = []
+
+    async def load() -> Dict[int, LessonResultSchema]:
+        calls.append(1)
+        return {1: LessonResultSchema(lesson_id=1, user_id=2, percentage=50)}
+
+    first = await cached_value("results", Dict[int, LessonResultSchema], load, 60)
+    second = await cached_value("results", Dict[int, LessonResultSchema], load, 60)
+
+    assert second == first
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_cached_value_serves_stale_and_refreshes(
+    cache_backend: MemoryBackend,
+) -> None:
+
+    values = iter([1, 2])
+
+    async def load() -> int:
+        return next(values)
+
+    def get_value() -> Awaitable[int]:
+        return cached_value("value", int, load, 10, stale_ttl=100, refresh=load)
+
+    assert await get_value() == 1
+
+    # свежая запись живет 10 сек из 110, после них - устаревшая
+    cache_backend.now += 20
+
+    assert await get_value() == 1
+    await asyncio.sleep(0.01)
+    assert await get_value() == 2
+
+
+@pytest.mark.asyncio
+async def test_invalidate_tags(redis_backend: TaggedRedisBackend) -> None:
+
+    redis = redis_backend.redis
+    prefix = FastAPICache.get_prefix()
+    await redis_backend.set_with_tags(f"{prefix}:a", b"1", 60, ["user:1", "catalog"])
+    await redis_backend.set_with_tags(f"{prefix}:b", b"2", 60, ["user:2", "catalog"])
+    await redis_backend.set_with_tags(f"{prefix}:c", b"3", 60, ["user:2"])
+    assert await redis.ttl(redis_backend.get_tag_key("catalog")) > 0
+
+    deleted = await redis_backend.invalidate(["user:2"])
+
+    assert sorted(deleted) == [f"{prefix}:b", f"{prefix}:c"]
+    assert await redis.exists(f"{prefix}:b", f"{prefix}:c") == 0
+    assert await redis.exists(redis_backend.get_tag_key("user:2")) == 0
+    assert await redis.get(f"{prefix}:a") == b"1"
+    assert await redis.smembers(redis_backend.get_tag_key("user:1")) == {
+        f"{prefix}:a".encode()
+    }
+    # тег catalog еще ссылается на удаленный ключ, повторный сброс безопасен
+    assert sorted(await redis_backend.invalidate(["catalog"])) == [
+        f"{prefix}:a",
+        f"{prefix}:b",
+    ]
+    assert await redis.exists(f"{prefix}:a") == 0
+
+
+@pytest.mark.asyncio
+async def test_invalidation_during_load_skips_store(
+    redis_backend: TaggedRedisBackend,
+) -> None:
+
+    key = f"{FastAPICache.get_prefix()}:progress"
+    values = iter([1, 2])
+
+    async def load() -> int:
+        value = next(values)
+        # запись в бд и сброс тега, пока значение вычисляется
+        await redis_backend.invalidate(["user:1"])
+        return value
+
+    assert await cached_value("progress", int, load, 60, ["user:1"]) == 1
+    assert await redis_backend.redis.exists(key) == 0
+
+    async def load_after_write() -> int:
+        return next(values)
+
+    assert await cached_value("progress", int, load_after_write, 60, ["user:1"]) == 2
+    assert await redis_backend.redis.get(key) == b"2"
+
+
+@pytest.mark.asyncio
+async def test_stale_refresh_waits_for_other_process(
+    redis_backend: TaggedRedisBackend,
+) -> None:
+
+    redis_backend.lock_timeout = 1
+    key = f"{FastAPICache.get_prefix()}:value"
+    refreshes: List[int] = []
+
+    async def refresh() -> int:
+        refreshes.append(1)
+        return 3
+
+    async def load() -> int:
+        return 1
+
+    assert await cached_value("value", int, load, 10, stale_ttl=100) == 1
+    await redis_backend.redis.expire(key, 5)  # запись устарела
+
+    # другой процесс уже обновляет запись под блокировкой
+    lock = redis_backend.redis.lock(f"{key}:lock", timeout=5)
+    assert await lock.acquire()
+    assert (
+        await cached_value("value", int, load, 10, stale_ttl=100, refresh=refresh) == 1
+    )
+    await redis_backend.set_with_tags(key, b"2", 110)
+    await lock.release()
+    await asyncio.gather(*_refresh_tasks)
+
+    assert refreshes == []
+    assert (
+        await cached_value("value", int, load, 10, stale_ttl=100, refresh=refresh) == 2
+    )
+
+
+@pytest.mark.asyncio
+async def test_stale_refresh_claimed_by_other_process(
+    redis_backend: TaggedRedisBackend,
+) -> None:
+
+    key = f"{FastAPICache.get_prefix()}:value"
+    refreshes: List[int] = []
+
+    async def refresh() -> int:
+        refreshes.append(1)
+        return 2
+
+    async def load() -> int:
+        return 1
+
+    assert await cached_value("value", int, load, 10, stale_ttl=100) == 1
+    await redis_backend.redis.expire(key, 5)  # запись устарела
+    assert await redis_backend.redis.set(f"{key}:refresh", b"other", nx=True, ex=5)
+
+    assert (
+        await cached_value("value", int, load, 10, stale_ttl=100, refresh=refresh) == 1
+    )
+    assert not _refresh_tasks
+    assert refreshes == []
+
+
+@pytest.mark.asyncio
+async def test_stale_refresh_does_not_overwrite_invalidated(
+    redis_backend: TaggedRedisBackend,
+) -> None:
+
+    key = f"{FastAPICache.get_prefix()}:progress"
+
+    async def refresh() -> int:
+        # обновление прочитало бд до записи, сброс тега пришел до сохранения
+        await redis_backend.invalidate(["user:1"])
+        return 1
+
+    async def load() -> int:
+        return 1
+
+    assert await cached_value("progress", int, load, 10, ["user:1"], 100) == 1
+    await redis_backend.redis.expire(key, 5)
+
+    assert (
+        await cached_value("progress", int, load, 10, ["user:1"], 100, refresh=refresh)
+        == 1
+    )
+    await asyncio.gather(*_refresh_tasks)
+
+    assert await redis_backend.redis.exists(key, f"{key}:refresh") == 0
+
+
+@pytest.mark.asyncio
+async def test_invalidation_reaches_local_cache_of_other_process(
+    redis_backend: TaggedRedisBackend,
+) -> None:
+
+    redis = redis_backend.redis
+    writer, reader = (
+        TwoTierRedisBackend(redis, LocalCache(max_entries=10, max_bytes=100, ttl=60))
+        for _ in range(2)
+    )
+    key = f"{FastAPICache.get_prefix()}:a"
+    listener = asyncio.create_task(reader.listen_invalidations())
+    channel = reader.get_invalidation_channel()
+    while (await redis.pubsub_numsub(channel))[0][1] == 0:
+        await asyncio.sleep(0.01)
+
+    await writer.set_with_tags(key, b"1", 60, ["user:1"])
+    assert await reader.get(key) == b"1"
+    assert reader.local_cache.get_with_ttl(key)[1] == b"1"
+
+    await writer.invalidate(["user:1"])
+    for _ in range(100):
+        if reader.local_cache.get_with_ttl(key)[1] is None:
+            break
+        await asyncio.sleep(0.01)
+    listener.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await listener
+
+    assert reader.local_cache.get_with_ttl(key)[1] is None
+    assert await reader.get(key) is None
@@ -0,0 +1,35 @@
+from src.core.local_cache import LocalCache
+
+
+def test_local_cache_lru_eviction():
+
+    local_cache = LocalCache(max_entries=2, max_bytes=10, ttl=60)
+    local_cache.set("a", b"1234")
+    local_cache.set("b", b"1234")
+    local_cache.get_with_ttl("a")
+    local_cache.set("c", b"1234")
+
+    assert local_cache.get_with_ttl("b") == (0, None)
+    assert local_cache.get_with_ttl("a")[1] == b"1234"
+    assert local_cache.get_with_ttl("c")[1] == b"1234"
+
+    local_cache.set("d", b"1234567")
+
+    assert len(local_cache) == 1
+    assert local_cache.size == 7
+    assert local_cache.get_with_ttl("d")[1] == b"1234567"
+
+
+def test_local_cache_ttl_bounded_by_remote_expire(mocker):
+
+    monotonic = mocker.patch("src.core.local_cache.time.monotonic", return_value=0)
+    local_cache = LocalCache(max_entries=10, max_bytes=100, ttl=5)
+    local_cache.set("a", b"1", expire=3)
+    local_cache.set("b", b"1", expire=100)
+
+    assert local_cache.get_with_ttl("b") == (100, b"1")
+
+    monotonic.return_value = 4
+
+    assert local_cache.get_with_ttl("a") == (0, None)
+    assert local_cache.get_with_ttl("b") == (96, b"1")
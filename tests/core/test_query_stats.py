@@ -0,0 +1,38 @@
+from typing import AsyncIterator
+
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from src.database.db_manager import AsyncPostgresDatabaseManager
+from tests.conftest import TEST_DB_URL
+
+
+def test_streaming_queries_are_counted(mocker):
+
+    from src.core import api as api_module
+
+    observe = mocker.patch.object(api_module, "observe_request_queries")
+    warning = mocker.patch.object(api_module.logger, "warning")
+    mocker.patch.object(api_module.settings.settings, "db_query_repeat_threshold", 2)
+    engine = AsyncPostgresDatabaseManager(url=TEST_DB_URL).engine
+    app = FastAPI()
+    app.add_middleware(api_module.QueryStatsMiddleware)
+
+    @app.get("/export")
+    async def export() -> StreamingResponse:
+        async def rows() -> AsyncIterator[bytes]:
+            # запросы выполняются уже во время отправки тела ответа
+            async with engine.connect() as conn:
+                for _ in range(3):
+                    yield str(await conn.scalar(text("select 1"))).encode()
+
+        return StreamingResponse(rows())
+
+    response = TestClient(app).get("/export")
+
+    assert response.content == b"111"
+    method, handler, stats = observe.call_args.args
+    assert (method, handler, stats.count) == ("GET", "/export", 3)
+    assert warning.call_count == 1
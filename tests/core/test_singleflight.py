@@ -0,0 +1,47 @@
+import asyncio
+
+import pytest
+
+from src.core.singleflight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_single_flight_coalesces_concurrent_calls():
+
+    flights: SingleFlight[int] = SingleFlight()
+    calls = []
+    release = asyncio.Event()
+
+    async def compute() -> int:
+        calls.append(1)
+        await release.wait()
+        return 42
+
+    tasks = [asyncio.create_task(flights.do("key", compute)) for _ in range(5)]
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await asyncio.gather(*tasks) == [42] * 5
+    assert len(calls) == 1
+    assert len(flights) == 0
+
+
+@pytest.mark.asyncio
+async def test_single_flight_retries_after_cancelled_leader():
+
+    flights: SingleFlight[int] = SingleFlight()
+    calls = []
+
+    async def compute() -> int:
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return len(calls)
+
+    leader = asyncio.create_task(flights.do("key", compute))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(flights.do("key", compute))
+    await asyncio.sleep(0)
+    leader.cancel()
+
+    assert await follower == 2
+    assert leader.cancelled()
@@ -0,0 +1,28 @@
+from src.database.dto import construct_schema, get_schema_columns
+from src.lessons.models import LessonModel
+from src.lessons.schemas import LessonBaseSchema, LessonSchema, LessonStepSchema
+
+
+def test_schema_columns():
+
+    columns = get_schema_columns(LessonSchema, LessonModel)
+
+    assert [column.key for column in columns] == [
+        "id",
+        "name",
+        "description",
+        "language",
+    ]
+
+
+def test_construct_schema():
+
+    lesson = LessonModel(id=1, name="lesson", language="ru")
+    step = LessonStepSchema(id=2, name="step")
+
+    result = construct_schema(LessonSchema, lesson, steps=[step])
+
+    assert result == LessonSchema(id=1, name="lesson", language="ru", steps=[step])
+    assert construct_schema(LessonBaseSchema, result) == LessonBaseSchema(
+        id=1, name="lesson", language="ru"
+    )
@@ -0,0 +1,40 @@
+import src.lessons.models  # noqa: F401
+import src.texts.models  # noqa: F401
+import src.users.models  # noqa: F401
+from src.database.base_model import BaseSqlAlchemyModel
+
+
+def test_foreign_keys_have_index():
+    """У каждого ForeignKey есть индекс, начинающийся с его колонок"""
+
+    missing = []
+    for table in BaseSqlAlchemyModel.metadata.sorted_tables:
+        indexed = [[column.name for column in index.columns] for index in table.indexes]
+        indexed += [
+            [column.name for column in constraint.columns]
+            for constraint in table.constraints
+            if constraint.__visit_name__ in ("primary_key", "unique_constraint")
+        ]
+        for foreign_key in table.foreign_key_constraints:
+            fk_columns = [column.name for column in foreign_key.columns]
+            if not any(columns[: len(fk_columns)] == fk_columns for columns in indexed):
+                missing.append(f"{table.name}({', '.join(fk_columns)})")
+
+    assert not missing, f"ForeignKey без индекса: {missing}"
+
+
+def test_indexes_are_named_as_in_migrations():
+    """Индексы объявлены в __table_args__ с именами из миграций"""
+
+    tables = BaseSqlAlchemyModel.metadata.tables
+    indexes = {
+        table: {index.name for index in tables[table].indexes}
+        for table in ("lesson_step_texts", "texts", "text_results", "text_timings")
+    }
+
+    assert indexes == {
+        "lesson_step_texts": {"ix_lesson_step_texts_lesson_step_id"},
+        "texts": {"ix_texts_config_id"},
+        "text_results": {"ix_text_results_user_id", "ix_text_results_text_id"},
+        "text_timings": {"ix_text_timings_text_result_id"},
+    }
@@ -0,0 +1,79 @@
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from src.core.errors import BadRequestError
+from src.database.pagination import (
+    decode_cursor,
+    encode_cursor,
+    get_order_columns,
+    keyset_filter,
+    order_columns_spec,
+    parse_order_by,
+)
+from src.lessons.models import LessonModel
+
+
+def test_parse_order_by():
+
+    assert parse_order_by(None) == []
+    assert parse_order_by("-name, id,") == ["-name", "id"]
+
+
+def test_cursor_roundtrip():
+
+    order_columns = get_order_columns(LessonModel, ["-name"])
+    cursor = encode_cursor(order_columns, LessonModel(id=7, name="lesson"))
+
+    assert decode_cursor(order_columns, cursor) == ["lesson", 7]
+
+    with pytest.raises(BadRequestError):
+        decode_cursor(get_order_columns(LessonModel, []), cursor)
+
+    with pytest.raises(BadRequestError):
+        decode_cursor(order_columns, "not a cursor")
+
+
+def test_cant_order_by_invalid_field():
+
+    with pytest.raises(BadRequestError):
+        get_order_columns(LessonModel, ["steps"])
+
+    with pytest.raises(BadRequestError):
+        get_order_columns(LessonModel, ["language"])  # nullable
+
+    with pytest.raises(BadRequestError):
+        get_order_columns(LessonModel, ["-id", "name"])  # id не последний
+
+
+def test_order_by_id():
+
+    assert order_columns_spec(get_order_columns(LessonModel, ["-id"])) == ["-id"]
+    assert order_columns_spec(get_order_columns(LessonModel, ["name", "id"])) == [
+        "name",
+        "id",
+    ]
+
+    order_columns = get_order_columns(LessonModel, ["-id"])
+    condition = keyset_filter(order_columns, [7])
+    sql = str(
+        condition.compile(
+            dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+        )
+    )
+
+    assert sql == "lessons.id < 7"
+
+
+def test_keyset_filter():
+
+    order_columns = get_order_columns(LessonModel, ["-name"])
+    condition = keyset_filter(order_columns, ["lesson", 7])
+    sql = str(
+        condition.compile(
+            dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+        )
+    )
+
+    assert sql == (
+        "lessons.name < 'lesson' OR lessons.name = 'lesson' AND lessons.id > 7"
+    )
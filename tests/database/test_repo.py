@@ -1,10 +1,14 @@
 import pytest
 from pydantic import BaseModel as BasePydanticModel
+from sqlalchemy.orm import joinedload, selectinload, subqueryload
 
+from src.core.errors import ResourceNotFoundError
 from src.database.base_model import BaseSqlAlchemyModel
 from src.database.base_repository import BaseSqlAlchemyRepository
 from src.lessons.models import LessonModel
 from src.lessons.schemas import LessonSchema
+from src.users.repository import UsersRepository
+from src.users.schemas import CreateUserSchema, UpdateUserSchema
 
 
 def test_cant_create_invalid_repo():
@@ -34,3 +38,94 @@ def test_can_create_repo():
         update_schema = LessonSchema
 
     assert TestRepo2.model is LessonModel
+
+
+def test_repo_loader_strategy():
+
+    class TestRepo3(BaseSqlAlchemyRepository):
+        model = LessonModel
+        entity_schema = LessonSchema
+        create_schema = LessonSchema
+        update_schema = LessonSchema
+
+    repo = TestRepo3(session=None)  # type: ignore
+
+    assert repo.get_loader() is selectinload
+    assert repo.get_loader("joined") is joinedload
+    assert repo.get_loader("subquery") is subqueryload
+
+
+@pytest.mark.asyncio
+async def test_add_many_keeps_input_order(db_session):
+
+    repo = UsersRepository(session=db_session)
+    users = await repo.add_many(
+        [
+            CreateUserSchema(username="repo-b", password="1"),
+            CreateUserSchema(username="repo-a", password="2"),
+        ]
+    )
+
+    assert [user.username for user in users] == ["repo-b", "repo-a"]
+    assert users[0].id < users[1].id
+
+
+@pytest.mark.asyncio
+async def test_upsert_many_updates_and_dedupes(db_session):
+
+    repo = UsersRepository(session=db_session)
+    (existing,) = await repo.add_many(
+        [CreateUserSchema(username="repo-a", password="old")]
+    )
+
+    users = await repo.upsert_many(
+        [
+            CreateUserSchema(username="repo-b", password="1"),
+            CreateUserSchema(username="repo-a", password="2"),
+            CreateUserSchema(username="repo-b", password="3"),
+        ],
+        index_elements=["username"],
+    )
+
+    assert [(user.username, user.password) for user in users] == [
+        ("repo-b", "3"),
+        ("repo-a", "2"),
+    ]
+    assert users[1].id == existing.id
+
+    skipped = await repo.upsert_many(
+        [CreateUserSchema(username="repo-a", password="4")],
+        index_elements=["username"],
+        update_fields=[],
+    )
+    assert skipped == []
+    assert (await repo.get_one(existing.id)).password == "2"
+
+
+@pytest.mark.asyncio
+async def test_update_many_keeps_input_order(db_session):
+
+    repo = UsersRepository(session=db_session)
+    first, second = await repo.add_many(
+        [
+            CreateUserSchema(username="repo-a", password="1"),
+            CreateUserSchema(username="repo-b", password="2"),
+        ]
+    )
+
+    users = await repo.update_many(
+        {
+            second.id: UpdateUserSchema(id=second.id, username="repo-d", password="4"),
+            first.id: UpdateUserSchema(id=first.id, username="repo-c", password="3"),
+        }
+    )
+
+    assert [(user.id, user.username) for user in users] == [
+        (second.id, "repo-d"),
+        (first.id, "repo-c"),
+    ]
+
+    with pytest.raises(ResourceNotFoundError):
+        await repo.update_many(
+            {-1: UpdateUserSchema(id=-1, username="repo-e", password="5")}
+        )
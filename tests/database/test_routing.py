@@ -0,0 +1,123 @@
+from types import SimpleNamespace
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, insert, select, text
+
+from src.core import settings
+from src.database.routing import (
+    USE_PRIMARY,
+    ReplicaSelector,
+    RoutingSession,
+    route_request,
+)
+from src.lessons.models import LessonModel
+
+
+def make_engine(name: str, checked_out: int = 0) -> SimpleNamespace:
+    """Заглушка AsyncEngine: sync_engine с пулом"""
+    pool = SimpleNamespace(checkedout=lambda: checked_out)
+    return SimpleNamespace(sync_engine=SimpleNamespace(name=name, pool=pool))
+
+
+def make_session(*replicas: SimpleNamespace) -> RoutingSession:
+    return RoutingSession(
+        info={
+            "primary": make_engine("primary").sync_engine,
+            "replica_selector": ReplicaSelector(replicas) if replicas else None,  # type: ignore
+        }
+    )
+
+
+def get_bind_name(session: RoutingSession, clause) -> str:
+    return session.get_bind(clause=clause).name
+
+
+def test_replica_selector_strategies():
+
+    replicas = [make_engine("r0", checked_out=3), make_engine("r1", checked_out=1)]
+
+    round_robin = ReplicaSelector(replicas)  # type: ignore
+    assert [round_robin.select().name for _ in range(3)] == ["r0", "r1", "r0"]
+
+    least_connections = ReplicaSelector(replicas, "least_connections")  # type: ignore
+    assert least_connections.select().name == "r1"
+
+
+def test_reads_go_to_replica_writes_to_primary():
+
+    session = make_session(make_engine("replica"))
+
+    assert get_bind_name(session, select(LessonModel)) == "replica"
+    assert get_bind_name(session, text("select 1")) == "primary"
+    assert get_bind_name(session, insert(LessonModel)) == "primary"
+    # после записи сессия читает только из основной бд
+    assert session.info[USE_PRIMARY]
+    assert get_bind_name(session, select(LessonModel)) == "primary"
+
+    assert get_bind_name(make_session(), select(LessonModel)) == "primary"
+
+
+def test_request_routing_state():
+
+    with route_request(use_primary=True):
+        session = make_session(make_engine("replica"))
+        assert get_bind_name(session, select(LessonModel)) == "primary"
+
+    with route_request() as state:
+        write_session = make_session(make_engine("replica"))
+        read_session = make_session(make_engine("replica"))
+        assert get_bind_name(read_session, select(LessonModel)) == "replica"
+
+        get_bind_name(write_session, insert(LessonModel))
+
+        assert state.wrote
+        assert get_bind_name(read_session, select(LessonModel)) == "primary"
+
+
+def test_primary_until_cookie(monkeypatch):
+
+    from src.core.api import PRIMARY_UNTIL_COOKIE, db_routing_middleware
+
+    monkeypatch.setattr(settings.settings, "postgres_replica_urls", ["replica"])
+    app = FastAPI()
+    app.middleware("http")(db_routing_middleware)
+
+    @app.post("/write")
+    async def write() -> str:
+        return get_bind_name(make_session(make_engine("replica")), insert(LessonModel))
+
+    @app.get("/read")
+    async def read() -> str:
+        return get_bind_name(make_session(make_engine("replica")), select(LessonModel))
+
+    client = TestClient(app)
+    assert client.get("/read").json() == "replica"
+    assert PRIMARY_UNTIL_COOKIE not in client.cookies
+
+    client.post("/write")
+    assert PRIMARY_UNTIL_COOKIE in client.cookies
+    assert client.get("/read").json() == "primary"
+
+    client.cookies.set(PRIMARY_UNTIL_COOKIE, "0")
+    assert client.get("/read").json() == "replica"
+
+
+def test_flush_switches_to_primary():
+
+    primary = create_engine("sqlite://")
+    LessonModel.__table__.create(primary)  # type: ignore[attr-defined]
+    replica = make_engine("replica")
+
+    with route_request() as state:
+        session = RoutingSession(
+            info={"primary": primary, "replica_selector": ReplicaSelector([replica])}  # type: ignore
+        )
+        assert session.get_bind(clause=select(LessonModel)) is replica.sync_engine
+
+        session.add(LessonModel(name="lesson"))
+        session.flush()
+
+        assert state.wrote
+        assert session.get_bind(clause=select(LessonModel)) is primary
+        session.rollback()
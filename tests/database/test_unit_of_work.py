@@ -0,0 +1,52 @@
+import pytest
+
+from src.database.unit_of_work import UOW_DEPTH, UnitOfWork
+
+
+@pytest.mark.asyncio
+async def test_uow_commit_once_on_outer_block(mocker):
+
+    session = mocker.AsyncMock()
+    session.info = {}
+    uow = UnitOfWork(session)
+
+    async with uow:
+        async with uow:
+            pass
+        session.commit.assert_not_awaited()
+
+    session.commit.assert_awaited_once()
+    session.rollback.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_uow_rollback_on_error(mocker):
+
+    session = mocker.AsyncMock()
+    session.info = {}
+    uow = UnitOfWork(session)
+
+    with pytest.raises(ValueError):
+        async with uow:
+            async with uow:
+                raise ValueError
+
+    session.rollback.assert_awaited_once()
+    session.commit.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_uows_on_one_session_commit_once(mocker):
+
+    session = mocker.AsyncMock()
+    session.info = {}
+    outer_uow = UnitOfWork(session)
+    inner_uow = UnitOfWork(session)
+
+    async with outer_uow:
+        async with inner_uow:
+            pass
+        session.commit.assert_not_awaited()
+
+    session.commit.assert_awaited_once()
+    assert session.info[UOW_DEPTH] == 0
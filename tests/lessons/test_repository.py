@@ -0,0 +1,113 @@
+import importlib
+
+import pytest
+from sqlalchemy import func, select, text
+
+from src.lessons.models import (
+    LessonModel,
+    LessonStepModel,
+    LessonStepResultModel,
+    LessonStepTimingModel,
+)
+from src.lessons.repository import LessonsStepResultRepository
+from src.lessons.schemas import CreateLessonStepResultSchema
+
+unique_results_migration = importlib.import_module(
+    "src.database.migrations.versions.17ad97798972_"
+)
+
+
+async def create_step(session) -> int:
+    lesson = LessonModel(name="repo-lesson")
+    step = LessonStepModel(name="repo-step", lesson=lesson)
+    session.add_all([lesson, step])
+    await session.flush()
+    return step.id
+
+
+async def get_timings(session, result_ids) -> list:
+    stmt = (
+        select(LessonStepTimingModel.seconds)
+        .where(LessonStepTimingModel.lesson_step_result_id.in_(result_ids))
+        .order_by(LessonStepTimingModel.id)
+    )
+    return list((await session.execute(stmt)).scalars())
+
+
+@pytest.mark.asyncio
+async def test_upsert_result_with_timing(db_session):
+
+    step_id = await create_step(db_session)
+    repo = LessonsStepResultRepository(session=db_session)
+
+    first_id = await repo.upsert_result_with_timing(
+        CreateLessonStepResultSchema(
+            lesson_step_id=step_id, user_id=1, percentage=50, wpm=10
+        ),
+        timing=30,
+    )
+    second_id = await repo.upsert_result_with_timing(
+        CreateLessonStepResultSchema(
+            lesson_step_id=step_id, user_id=1, percentage=100, wpm=20
+        ),
+        timing=20,
+    )
+    third_id = await repo.upsert_result_with_timing(
+        CreateLessonStepResultSchema(
+            lesson_step_id=step_id, user_id=1, percentage=90, wpm=30
+        ),
+    )
+
+    assert first_id == second_id == third_id
+    results = (
+        await db_session.execute(
+            select(LessonStepResultModel.percentage, LessonStepResultModel.wpm).where(
+                LessonStepResultModel.lesson_step_id == step_id
+            )
+        )
+    ).all()
+    assert [tuple(row) for row in results] == [(90, 30)]
+    assert await get_timings(db_session, [first_id]) == [30, 20]
+
+
+@pytest.mark.asyncio
+async def test_migration_merges_duplicate_results(db_session):
+
+    step_id = await create_step(db_session)
+    await db_session.execute(
+        text("DROP INDEX ix_lesson_step_results_user_id_lesson_step_id")
+    )
+    results = [
+        LessonStepResultModel(lesson_step_id=step_id, user_id=1, percentage=percentage)
+        for percentage in (10, 20)
+    ]
+    db_session.add_all(results)
+    await db_session.flush()
+    db_session.add_all(
+        [
+            LessonStepTimingModel(lesson_step_result_id=result.id, seconds=seconds)
+            for result, seconds in zip(results, (30, 40))
+        ]
+    )
+    await db_session.flush()
+
+    await db_session.execute(text(unique_results_migration.MOVE_DUPLICATE_TIMINGS))
+    await db_session.execute(text(unique_results_migration.DELETE_DUPLICATE_RESULTS))
+
+    kept = (
+        await db_session.execute(
+            select(LessonStepResultModel.id, LessonStepResultModel.percentage).where(
+                LessonStepResultModel.lesson_step_id == step_id
+            )
+        )
+    ).all()
+    assert [tuple(row) for row in kept] == [(results[1].id, 20)]
+    assert sorted(await get_timings(db_session, [results[1].id])) == [30, 40]
+    assert (
+        await db_session.scalar(
+            select(func.count()).where(
+                LessonStepTimingModel.lesson_step_result_id == results[0].id
+            )
+        )
+        == 0
+    )
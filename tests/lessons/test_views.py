@@ -1,3 +1,5 @@
+from typing import Callable, ContextManager, List
+
 import pytest
 from fastapi import status
 from fastapi.testclient import TestClient
@@ -8,8 +10,10 @@ from fastapi.testclient import TestClient
 async def test_get_lessons(
     test_client: TestClient,
     request: pytest.FixtureRequest,
+    query_budget: Callable[[int], ContextManager[List[str]]],
 ) -> None:
-    response = test_client.get("/lessons/")
+    with query_budget(1):
+        response = test_client.get("/lessons/")
 
     assert response.status_code == status.HTTP_200_OK
-    assert len(response.json()) > 0
+    assert len(response.json()["items"]) > 0
@@ -0,0 +1,35 @@
+import time
+
+from src.users.auth_cache import AuthCache, ExpiringCache, VerifiedToken
+from src.users.schemas import UserAuthSchema
+
+
+def test_expiring_cache_evicts_expired_and_oldest():
+
+    cache: ExpiringCache[str, int] = ExpiringCache("test", max_entries=2)
+    cache.set("a", 1, ttl=60)
+    cache.set("b", 2, ttl=60)
+    cache.set("expired", 3, ttl=-1)
+    assert cache.get("a") == 1
+    cache.set("c", 3, ttl=60)
+
+    assert cache.get("b") is None
+    assert cache.get("expired") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+
+
+def test_invalidate_user_drops_user_and_tokens():
+
+    auth_cache = AuthCache(max_tokens=10, max_users=10, user_ttl=60)
+    expire = int(time.time()) + 60
+    auth_cache.set_token("token-1", VerifiedToken(user_id=1, expire=expire))
+    auth_cache.set_token("token-2", VerifiedToken(user_id=2, expire=expire))
+    auth_cache.set_token("expired", VerifiedToken(user_id=2, expire=expire - 120))
+    auth_cache.set_user(UserAuthSchema(id=1, is_admin=True))
+
+    auth_cache.invalidate_user(1)
+
+    assert auth_cache.get_token("token-1") is None
+    assert auth_cache.get_user(1) is None
+    assert auth_cache.get_token("token-2") == VerifiedToken(user_id=2, expire=expire)
+    assert auth_cache.get_token("expired") is None
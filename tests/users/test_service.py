@@ -0,0 +1,46 @@
+import pytest
+from sqlalchemy import func, select
+
+from src.database.unit_of_work import UnitOfWork
+from src.users.errors import AuthError
+from src.users.models import UserModel
+from src.users.repository import UsersRepository
+from src.users.schemas import CreateUserSchema
+from src.users.service import AuthService
+
+
+@pytest.mark.asyncio
+async def test_register_user(db_session, mocker):
+
+    # bcrypt здесь не проверяется, только запись пользователя
+    mocker.patch.object(AuthService, "get_password_hash", return_value="hash")
+    auth_service = AuthService(
+        user_repo=UsersRepository(session=db_session), uow=UnitOfWork(db_session)
+    )
+
+    response = await auth_service.register_user(
+        CreateUserSchema(username="new-user", password="password")
+    )
+
+    user_id = await db_session.scalar(
+        select(UserModel.id).where(UserModel.username == "new-user")
+    )
+    assert auth_service.check_access_token(response.token) == user_id
+
+    with pytest.raises(AuthError):
+        await auth_service.register_user(
+            CreateUserSchema(username="new-user", password="other")
+        )
+
+    assert (
+        await db_session.scalar(
+            select(func.count()).where(UserModel.username == "new-user")
+        )
+        == 1
+    )
+    assert (
+        await db_session.scalar(
+            select(UserModel.password).where(UserModel.id == user_id)
+        )
+        == "hash"
+    )
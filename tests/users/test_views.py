@@ -1,3 +1,22 @@
+import json
+import uuid
+from typing import AsyncIterator, Callable, ContextManager, Dict, List
+
+import pytest
+import pytest_asyncio
+from fastapi import status
+from fastapi.testclient import TestClient
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from src.core.settings import settings
+from src.lessons.models import LessonStepResultModel, LessonStepTimingModel
+from src.users.auth_cache import auth_cache
+from src.users.models import UserModel
+from src.users.service import AuthService
+from tests.conftest import TEST_DB_URL
+
 # from fastapi.testclient import TestClient
 # from fastapi import status
 # import pytest
@@ -11,3 +30,90 @@
 
 #     assert response.status_code == status.HTTP_200_OK
 #     assert "token" in response.json()
+
+
+EXPORTS = {
+    "/users/export": UserModel,
+    "/lessons/results/export": LessonStepResultModel,
+    "/lessons/timings/export": LessonStepTimingModel,
+}
+
+
+@pytest_asyncio.fixture()
+async def user_tokens(fake_db_create) -> AsyncIterator[Dict[str, str]]:
+    """Токены созданных для теста администратора ("admin") и пользователя ("user")
+
+    Пользователи фиксируются в бд, чтобы их видели сессии приложения,
+    и удаляются после теста.
+    """
+    engine = create_async_engine(TEST_DB_URL, poolclass=NullPool)
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        suffix = uuid.uuid4().hex
+        users = {
+            role: UserModel(
+                username=f"{role}-{suffix}", password="-", is_admin=is_admin
+            )
+            for role, is_admin in (("admin", True), ("user", False))
+        }
+        session.add_all(users.values())
+        await session.commit()
+        try:
+            yield {
+                role: AuthService.create_access_token({"sub": str(user.id)})
+                for role, user in users.items()
+            }
+        finally:
+            await session.execute(
+                delete(UserModel).where(
+                    UserModel.id.in_([user.id for user in users.values()])
+                )
+            )
+            await session.commit()
+            for user in users.values():
+                auth_cache.invalidate_user(user.id)
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("url", EXPORTS)
+async def test_export_requires_admin(
+    test_client: TestClient,
+    query_budget: Callable[[int], ContextManager[List[str]]],
+    user_tokens: Dict[str, str],
+    url: str,
+) -> None:
+    token = user_tokens["user"]
+
+    response = test_client.get(url)
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    with query_budget(1):
+        response = test_client.get(url, headers={"Authorization": token})
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    with query_budget(0):
+        response = test_client.get(url, headers={"Authorization": token})
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("url", EXPORTS)
+async def test_export_streams_ndjson(
+    test_client: TestClient,
+    db_session: AsyncSession,
+    monkeypatch: pytest.MonkeyPatch,
+    user_tokens: Dict[str, str],
+    url: str,
+) -> None:
+    # несколько пачек, читаемых уже после закрытия зависимостей запроса
+    monkeypatch.setattr(settings, "stream_batch_size", 2)
+    model = EXPORTS[url]
+    ids = list(
+        (await db_session.execute(select(model.id).order_by(model.id))).scalars()
+    )
+    response = test_client.get(url, headers={"Authorization": user_tokens["admin"]})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = response.content.splitlines()
+    assert [json.loads(line)["id"] for line in lines] == ids